@@ -1,18 +1,203 @@
+import asyncio
+import json
+import logging
 import os
-from datetime import datetime
+import tarfile
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Literal
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-app = FastAPI(title="CodeCleaner Backend")
+from backend_jobs import JobQueue
+from backend_limits import ClientLimits, QueueFull, RequestLimits
+from backend_metrics import Metrics
+from backend_store import CodeStore, WriteQueue
+from cleaner_analysis import analyze_source
+from cleaner_cache import ResultCache, cached_clean_source, clean_job
+from cleaner_format import warm_up
+from cleaner_profile import log_timings, setup_logging
+from cleaner_rules import EXTRA_RULES
+from cleaner_verify import VerificationError
+
+
+@asynccontextmanager
+async def lifespan(app):
+    setup_logging()
+    WRITES.start()
+    yield
+    await WRITES.close()
+    if _analysis_pool is not None:
+        _analysis_pool.shutdown(cancel_futures=True)
+    JOBS.shutdown()
+
+
+app = FastAPI(title="CodeCleaner Backend", lifespan=lifespan)
+log = logging.getLogger("code_cleaner.backend")
+METRICS = Metrics()
+LIMITS = ClientLimits(
+    int(os.environ.get("CODE_CLEANER_CLIENT_CONCURRENCY", "16")) or None)
+MAX_BODY = int(os.environ.get("CODE_CLEANER_MAX_BODY", str(8 * 1024 * 1024)))
+MAX_BULK_BODY = int(os.environ.get("CODE_CLEANER_MAX_BULK_BODY",
+                                   str(1024 * 1024 * 1024)))
+# limits on what archives unpack to, per member and in total
+MAX_MEMBER_SIZE = int(os.environ.get("CODE_CLEANER_MAX_MEMBER", str(MAX_BODY)))
+MAX_UNPACKED = int(os.environ.get("CODE_CLEANER_MAX_UNPACKED", str(MAX_BULK_BODY)))
+# added before record_timing, so rejected requests are still timed
+app.add_middleware(
+    RequestLimits, limits=LIMITS, max_body=MAX_BODY,
+    body_limits={"/upload_bulk/": MAX_BULK_BODY})
 
 
 class CodePayload(BaseModel):
     cleaned_code: str
 
 
+class CleanRequest(BaseModel):
+    code: str
+    remove_comments: bool = False
+    comment_mode: Literal["line", "tokenize"] = "line"
+    trim_trailing: bool = True
+    collapse_blank: bool = True
+    use_autopep8: bool = False
+    sort_imports: bool = False
+    rules: list[Literal[EXTRA_RULES]] = []
+    verify: bool = False
+
+
 SAVE_DIR = "received_codes"
 os.makedirs(SAVE_DIR, exist_ok=True)
+STORE = CodeStore(SAVE_DIR)
+
+CACHE = ResultCache(os.environ.get("CODE_CLEANER_CACHE_DIR"))
+
+ANALYSIS_WORKERS = int(os.environ.get("CODE_CLEANER_ANALYSIS_WORKERS", "0")) or None
+ANALYSIS_MAX_PENDING = int(os.environ.get("CODE_CLEANER_ANALYSIS_QUEUE", "32"))
+_analysis_pool = None
+_analysis_pending = 0
+
+WRITES = WriteQueue(
+    STORE,
+    max_pending=int(os.environ.get("CODE_CLEANER_WRITE_QUEUE", "256")),
+    fsync=os.environ.get("CODE_CLEANER_FSYNC", "1") != "0")
+
+JOBS = JobQueue(
+    workers=int(os.environ.get("CODE_CLEANER_JOB_WORKERS", "0")) or None,
+    max_pending=int(os.environ.get("CODE_CLEANER_JOB_QUEUE", "64")),
+    initializer=warm_up)
+
+BULK_WRITE_CONCURRENCY = 16
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+TAR_TYPES = ("application/x-tar", "application/gzip", "application/x-gzip",
+             "application/x-gtar")
+ZIP_TYPES = ("application/zip", "application/x-zip-compressed")
+
+
+def _safe_relpath(name):
+    parts = [p for p in name.replace("\\", "/").split("/")
+             if p not in ("", ".", "..")]
+    return os.path.join(*parts) if parts else None
+
+
+def _get_analysis_pool():
+    global _analysis_pool
+    if _analysis_pool is None:
+        _analysis_pool = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS)
+    return _analysis_pool
+
+
+def _stored(name, record):
+    return {"name": name, "status": "success", "id": record["id"],
+            "sha256": record["sha256"], "filename": record["filename"],
+            "deduplicated": record["deduplicated"]}
+
+
+def _clean_options(data):
+    return {"remove_comments": data.remove_comments,
+            "comment_mode": data.comment_mode,
+            "trim_trailing": data.trim_trailing,
+            "collapse_blank": data.collapse_blank,
+            "use_autopep8": data.use_autopep8,
+            "sort_imports": data.sort_imports,
+            **({"rules": data.rules} if data.rules else {}),
+            **({"verify": True} if data.verify else {})}
+
+
+async def _iter_ndjson(request):
+    buffer = bytearray()
+    async for chunk in request.stream():
+        buffer.extend(chunk)
+        start = 0
+        end = buffer.find(b"\n")
+        while end != -1:
+            line = bytes(buffer[start:end])
+            if line.strip():
+                yield line
+            start = end + 1
+            end = buffer.find(b"\n", start)
+        del buffer[:start]
+    if bytes(buffer).strip():
+        yield bytes(buffer)
+
+
+def _read_member(open_member, size, limit):
+    """Read an archive member unless it unpacks to over ``limit`` bytes.
+
+    The size the archive declares is checked first, then at most one byte
+    over the limit is read in case the declared size was wrong.
+    """
+    if size > limit:
+        raise ValueError(f"unpacks to {size} bytes, over the {limit} byte limit")
+    with open_member() as f:
+        data = f.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError(f"unpacks to over the {limit} byte limit")
+    return data
+
+
+def _iter_archive(spool, kind, limit):
+    """Yield ``(name, read)`` for every file in a tar or zip archive.
+
+    ``read()`` returns the member's bytes, raising ValueError for one over
+    ``limit`` bytes, and must be called before the next member is
+    requested; tar archives are read as a stream.
+    """
+    if kind == "zip":
+        with zipfile.ZipFile(spool) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, partial(
+                        _read_member, partial(archive.open, info),
+                        info.file_size, limit)
+    else:
+        with tarfile.open(fileobj=spool, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, partial(
+                        _read_member, partial(archive.extractfile, member),
+                        member.size, limit)
+
+
+@app.middleware("http")
+async def record_timing(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        METRICS.observe(endpoint, time.perf_counter() - start, status)
 
 
 @app.get("/")
@@ -21,32 +206,246 @@ def home():
 
 
 @app.post("/upload_code/")
-def receive_code(data: CodePayload):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{SAVE_DIR}/cleaned_{timestamp}.py"
-
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(data.cleaned_code)
+async def receive_code(data: CodePayload):
+    """Store ``cleaned_code`` through the write queue; 503 when it is full."""
+    try:
+        record = await WRITES.submit(data.cleaned_code)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Write queue is full: {e}",
+                            headers={"Retry-After": "1"})
+    filename = record["filename"]
 
-    print(f"[INFO] Received code saved to: {filename}")
+    log.info(json.dumps({"event": "upload", "id": record["id"],
+                         "sha256": record["sha256"], "size": record["size"],
+                         "deduplicated": record["deduplicated"]}))
     return {
         "status": "success",
         "message": f"Code received and saved to {filename}",
-        "filename": filename
+        "filename": filename,
+        "id": record["id"],
+        "sha256": record["sha256"],
+        "deduplicated": record["deduplicated"]
     }
 
 
+@app.get("/uploads/{upload_id}")
+def get_upload(upload_id: str):
+    record = STORE.get(upload_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown upload id")
+    with open(record["filename"], "r", encoding="utf-8", errors="replace") as f:
+        return dict(record, cleaned_code=f.read())
+
+
 @app.post("/analyze_code/")
-async def analyze_code(request: Request):
-    """Ek uç nokta: İleride kodu analiz etmek istersen kullanılabilir"""
-    data = await request.json()
-    code = data.get("cleaned_code", "")
-    lines = len(code.splitlines())
-    chars = len(code)
+async def analyze_code(data: CodePayload):
+    """Return AST based metrics for ``cleaned_code``.
+
+    Parsing runs in a process pool, so a large file neither blocks the
+    event loop nor holds the GIL while other requests are served. Past
+    ``ANALYSIS_MAX_PENDING`` analyses in flight the answer is 503.
+    """
+    global _analysis_pending
+    if _analysis_pending >= ANALYSIS_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Analysis queue is full",
+                            headers={"Retry-After": "1"})
+    loop = asyncio.get_running_loop()
+    _analysis_pending += 1
+    try:
+        metrics = await loop.run_in_executor(
+            _get_analysis_pool(), analyze_source, data.cleaned_code)
+    finally:
+        _analysis_pending -= 1
     return {
-        "status": "ok",
-        "lines": lines,
-        "characters": chars,
+        "status": "ok" if metrics["syntax_error"] is None else "syntax_error",
+        **metrics,
         "message": "Code analyzed successfully"
     }
 
+
+@app.post("/clean_code/")
+def clean_code(data: CleanRequest):
+    stats = {}
+    timings = []
+    try:
+        cleaned = cached_clean_source(data.code, cache=CACHE, stats=stats,
+                                      timings=timings, **_clean_options(data))
+    except VerificationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    METRICS.observe_passes(timings)
+    log_timings("clean", timings, lines_in=stats.get("lines_in"),
+                lines_out=stats.get("lines_out"))
+    return {
+        "status": "ok",
+        "cleaned_code": cleaned,
+        "stats": stats,
+        "timings": timings
+    }
+
+
+def _job_or_404(job_id):
+    found = JOBS.get(job_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return found
+
+
+@app.post("/jobs/", status_code=202)
+def submit_job(data: CleanRequest):
+    """Queue ``data`` for cleaning on the job pool and return its id.
+
+    Answers 429 with ``Retry-After`` when the queue is full.
+    """
+    try:
+        job_id = JOBS.submit(clean_job, data.code, CACHE, _clean_options(data))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Job queue is full: {e}",
+                            headers={"Retry-After": "1"})
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result"
+    }
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    status, job = _job_or_404(job_id)
+    return {
+        "job_id": job_id,
+        "status": status,
+        "submitted_at": job["submitted_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "queue_depth": JOBS.pending
+    }
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    status, job = _job_or_404(job_id)
+    if status == "error":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {status}")
+    return {"status": "ok", "job_id": job_id, **job["result"]}
+
+
+@app.get("/metrics")
+def metrics():
+    """Request latency per endpoint and time spent in each cleaning pass."""
+    return dict(METRICS.snapshot(), job_queue_depth=JOBS.pending,
+                write_queue_depth=WRITES.pending,
+                analysis_queue_depth=_analysis_pending,
+                requests_in_flight=LIMITS.in_flight,
+                requests_rejected=LIMITS.rejected)
+
+
+@app.post("/upload_bulk/")
+async def upload_bulk(request: Request):
+    """Store many files from one NDJSON, tar or zip request body.
+
+    NDJSON lines look like ``{"filename": "pkg/mod.py", "cleaned_code": "..."}``
+    and are parsed as the body streams in, with at most
+    ``BULK_WRITE_CONCURRENCY`` writes in flight on the write queue, which
+    slows reading the body down when the queue is full.
+    Archives are spooled to a temporary file first (zip needs random
+    access) and unpacked member by member on the thread pool, feeding the
+    write queue the same way. A member unpacking to over
+    ``MAX_MEMBER_SIZE`` bytes is reported as failed without being read,
+    and an archive unpacking to over ``MAX_UNPACKED`` in total gets 413.
+    Every file goes into ``STORE`` tagged with the request's batch id.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    batch_id = uuid.uuid4().hex
+    results = []
+    slots = asyncio.Semaphore(BULK_WRITE_CONCURRENCY)
+    tasks = []
+
+    async def save(entry, name, code):
+        try:
+            record = await WRITES.submit(code, name=name,
+                                         batch_id=batch_id, wait=True)
+            entry.update(_stored(name, record))
+        except Exception as e:
+            entry.update(status="error", message=str(e))
+        finally:
+            slots.release()
+
+    async def queue_save(name, code):
+        entry = {"name": name}
+        results.append(entry)
+        await slots.acquire()
+        tasks.append(asyncio.create_task(save(entry, name, code)))
+
+    if content_type in NDJSON_TYPES:
+        index = 0
+        try:
+            async for line in _iter_ndjson(request):
+                index += 1
+                try:
+                    item = json.loads(line)
+                    code = item["cleaned_code"]
+                    name = _safe_relpath(str(item.get("filename") or "")) \
+                        or f"file_{index}.py"
+                except (ValueError, KeyError, TypeError) as e:
+                    results.append({"name": f"line {index}", "status": "error",
+                                    "message": f"invalid entry: {e}"})
+                    continue
+                await queue_save(name, code)
+        finally:
+            # a 413 part way through still waits for the queued writes
+            await asyncio.gather(*tasks)
+    elif content_type in TAR_TYPES or content_type in ZIP_TYPES:
+        kind = "zip" if content_type in ZIP_TYPES else "tar"
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+            async for chunk in request.stream():
+                await run_in_threadpool(spool.write, chunk)
+            spool.seek(0)
+            members = _iter_archive(spool, kind, MAX_MEMBER_SIZE)
+            unpacked = 0
+            try:
+                while True:
+                    member = await run_in_threadpool(next, members, None)
+                    if member is None:
+                        break
+                    name, read = member
+                    rel = _safe_relpath(name)
+                    if rel is None:
+                        continue
+                    try:
+                        data = await run_in_threadpool(read)
+                    except Exception as e:
+                        results.append({"name": name, "status": "error",
+                                        "message": str(e)})
+                        continue
+                    unpacked += len(data)
+                    if unpacked > MAX_UNPACKED:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"Archive unpacks to over {MAX_UNPACKED} bytes")
+                    await queue_save(rel, data)
+            except (tarfile.TarError, zipfile.BadZipFile) as e:
+                raise HTTPException(status_code=400,
+                                    detail=f"Invalid {kind} archive: {e}")
+            finally:
+                # writes already queued still finish before we answer
+                await asyncio.gather(*tasks)
+                await run_in_threadpool(members.close)
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Send application/x-ndjson, application/x-tar or application/zip")
+
+    failed = sum(1 for r in results if r["status"] != "success")
+    log.info(json.dumps({"event": "upload_bulk", "batch_id": batch_id,
+                         "saved": len(results) - failed, "failed": failed}))
+    return {
+        "status": "success" if not failed else "partial",
+        "message": f"{len(results) - failed} files saved (batch {batch_id})",
+        "batch_id": batch_id,
+        "saved": len(results) - failed,
+        "failed": failed,
+        "files": results
+    }
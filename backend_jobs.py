@@ -0,0 +1,94 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from backend_limits import QueueFull
+
+DEFAULT_MAX_PENDING = 64
+DEFAULT_KEEP_FINISHED = 1024
+
+
+class JobQueue:
+    """Background jobs on a bounded process pool.
+
+    At most ``max_pending`` jobs may be queued or running; ``submit`` raises
+    ``QueueFull`` beyond that instead of letting work pile up. Finished
+    jobs are kept for polling until ``keep_finished`` newer ones push them
+    out.
+    """
+
+    def __init__(self, workers=None, max_pending=DEFAULT_MAX_PENDING,
+                 keep_finished=DEFAULT_KEEP_FINISHED, initializer=None):
+        self.workers = workers
+        self.initializer = initializer
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._pending = 0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 initializer=self.initializer)
+        return self._executor
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+            job_id = uuid.uuid4().hex
+            job = {"id": job_id, "submitted_at": time.time(),
+                   "finished_at": None, "future": None, "result": None,
+                   "error": None}
+            self._jobs[job_id] = job
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                del self._jobs[job_id]
+            raise
+        job["future"] = future
+        future.add_done_callback(lambda f: self._finish(job, f))
+        return job_id
+
+    def _finish(self, job, future):
+        try:
+            job["result"] = future.result()
+        except Exception as e:
+            job["error"] = f"{type(e).__name__}: {e}"
+        job["finished_at"] = time.time()
+        with self._lock:
+            self._pending -= 1
+            finished = [j for j in self._jobs.values() if j["finished_at"]]
+            for old in finished[:max(0, len(finished) - self.keep_finished)]:
+                del self._jobs[old["id"]]
+
+    @staticmethod
+    def _status(job):
+        if job["finished_at"]:
+            return "error" if job["error"] else "done"
+        future = job["future"]
+        return "running" if future is not None and future.running() else "queued"
+
+    def get(self, job_id):
+        """Return ``(status, job)`` for ``job_id``, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return self._status(job), job
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
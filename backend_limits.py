@@ -0,0 +1,104 @@
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+DEFAULT_MAX_BODY = 8 * 1024 * 1024
+DEFAULT_PER_CLIENT = 16
+
+
+class QueueFull(Exception):
+    """A bounded job or write queue has no room left."""
+
+
+class ClientLimits:
+    """Requests in flight per client address, shared with ``RequestLimits``.
+
+    ``per_client`` of None means no limit.
+    """
+
+    def __init__(self, per_client=DEFAULT_PER_CLIENT):
+        self.per_client = per_client
+        self.active = {}
+        self.rejected = 0
+
+    @property
+    def in_flight(self):
+        return sum(self.active.values())
+
+    def acquire(self, client):
+        count = self.active.get(client, 0)
+        if self.per_client is not None and count >= self.per_client:
+            self.rejected += 1
+            return False
+        self.active[client] = count + 1
+        return True
+
+    def release(self, client):
+        count = self.active[client] - 1
+        if count:
+            self.active[client] = count
+        else:
+            del self.active[client]
+
+
+def _content_length(scope):
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class RequestLimits:
+    """ASGI middleware capping request bodies and requests per client.
+
+    A body over ``max_body`` bytes (``body_limits`` maps a path to its own
+    cap) is refused with 413, up front if Content-Length announces it and
+    otherwise as soon as that much has streamed in. A client that already
+    has ``limits.per_client`` requests in flight gets 429 straight away
+    instead of a place in the thread pool.
+    """
+
+    def __init__(self, app, limits, max_body=DEFAULT_MAX_BODY, body_limits=None):
+        self.app = app
+        self.limits = limits
+        self.max_body = max_body
+        self.body_limits = body_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        max_body = self.body_limits.get(scope["path"], self.max_body)
+        length = _content_length(scope)
+        if length is not None and length > max_body:
+            response = JSONResponse(
+                {"detail": f"Request body is over {max_body} bytes"},
+                status_code=413)
+            await response(scope, receive, send)
+            return
+        client = scope["client"][0] if scope.get("client") else None
+        if not self.limits.acquire(client):
+            response = JSONResponse(
+                {"detail": "Too many concurrent requests from this client"},
+                status_code=429, headers={"Retry-After": "1"})
+            await response(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Request body is over {max_body} bytes")
+            return message
+
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            self.limits.release(client)
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import deque
+
+from cleaner_profile import merge
+
+LATENCY_WINDOW = 1024
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1,
+                max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Metrics:
+    """Per-endpoint request timings and per-pass cleaning totals.
+
+    Latency percentiles are taken over the last ``LATENCY_WINDOW``
+    requests of each endpoint; counts and totals cover the whole uptime.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._passes = {}
+
+    def observe(self, endpoint, seconds, status):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = {
+                    "count": 0, "errors": 0, "seconds": 0.0,
+                    "recent": deque(maxlen=LATENCY_WINDOW)}
+            entry["count"] += 1
+            entry["errors"] += status >= 500
+            entry["seconds"] += seconds
+            entry["recent"].append(seconds)
+
+    def observe_passes(self, timings):
+        with self._lock:
+            merge(self._passes, timings)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {}
+            for name, entry in self._endpoints.items():
+                recent = sorted(entry["recent"])
+                endpoints[name] = {
+                    "count": entry["count"],
+                    "errors": entry["errors"],
+                    "mean_ms": entry["seconds"] / entry["count"] * 1000,
+                    **{f"p{p}_ms": _percentile(recent, p) * 1000
+                       for p in (50, 95, 99)},
+                }
+            return {"uptime": time.time() - self.started,
+                    "endpoints": endpoints,
+                    "passes": [dict(t) for t in self._passes.values()]}
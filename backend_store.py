@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from backend_limits import QueueFull
+
+DEFAULT_WRITE_QUEUE = 256
+WRITE_BATCH = 64
+
+
+class CodeStore:
+    """Content-addressed storage for received code.
+
+    Each distinct content is written once, to
+    ``<root>/blobs/<sha[:2]>/<sha[2:4]>/<sha>.py``, through a temporary file
+    and an atomic rename, so concurrent uploads can never clobber each
+    other and identical uploads share one blob. ``index.jsonl`` records
+    every upload (its id, blob hash, name and time) and is loaded into
+    memory at startup.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.index_path = os.path.join(root, "index.jsonl")
+        self._lock = threading.Lock()
+        self._index = {}
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._index[record["id"]] = record
+        except FileNotFoundError:
+            pass
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256[:2], sha256[2:4], f"{sha256}.py")
+
+    def _write_blob(self, sha256, data, fsync=False):
+        """Write ``data`` unless the blob exists; returns True if it did."""
+        path = self.blob_path(sha256)
+        if os.path.exists(path):
+            return False
+        shard = os.path.dirname(path)
+        os.makedirs(shard, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=shard, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        return True
+
+    def put(self, code, name=None, batch_id=None):
+        """Store ``code`` (str or bytes) and return its index record."""
+        return self.put_many([(code, name, batch_id)])[0]
+
+    def put_many(self, items, fsync=False):
+        """``put`` every ``(code, name, batch_id)`` in ``items``.
+
+        The index lines of the whole batch go out in one append. With
+        ``fsync`` the new blobs and then the index are flushed to disk
+        before this returns, so the index is synced once per batch.
+        """
+        records = []
+        written = []
+        for code, name, batch_id in items:
+            data = code.encode("utf-8") if isinstance(code, str) else code
+            sha256 = hashlib.sha256(data).hexdigest()
+            written.append(self._write_blob(sha256, data, fsync))
+            records.append({
+                "id": uuid.uuid4().hex,
+                "sha256": sha256,
+                "size": len(data),
+                "name": name,
+                "batch_id": batch_id,
+                "received_at": datetime.now().isoformat(timespec="seconds"),
+            })
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        with self._lock:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            for record in records:
+                self._index[record["id"]] = record
+        return [dict(record, filename=self.blob_path(record["sha256"]),
+                     deduplicated=not was_written)
+                for record, was_written in zip(records, written)]
+
+    def get(self, upload_id):
+        """Return the index record for ``upload_id``, or None."""
+        with self._lock:
+            record = self._index.get(upload_id)
+        if record is None:
+            return None
+        return dict(record, filename=self.blob_path(record["sha256"]))
+
+    def read(self, upload_id):
+        record = self.get(upload_id)
+        if record is None:
+            return None
+        with open(record["filename"], "rb") as f:
+            return f.read()
+
+
+class WriteQueue:
+    """Bounded queue of ``CodeStore`` writes drained by one writer task.
+
+    ``submit`` raises ``QueueFull`` when ``max_pending`` writes are already
+    waiting, or with ``wait`` waits for room, instead of letting them pile
+    up. The writer takes up to ``batch_size`` queued writes at a time and
+    hands them to ``put_many`` on its own thread, so request threads never
+    block on the disk and fsync runs once per batch.
+    """
+
+    def __init__(self, store, max_pending=DEFAULT_WRITE_QUEUE,
+                 batch_size=WRITE_BATCH, fsync=True):
+        self.store = store
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._queue = None
+        self._task = None
+        self._writing = 0
+        self._executor = None
+
+    @property
+    def pending(self):
+        """Writes queued or being written."""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + self._writing
+
+    def start(self):
+        if self._task is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="store-writer")
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, code, name=None, batch_id=None, wait=False):
+        """Queue a ``put`` and return its record once the batch is stored."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        item = (code, name, batch_id, future)
+        if wait:
+            await self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                raise QueueFull(f"{self.pending} writes already pending") from None
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._writing = len(batch)
+            try:
+                records = await loop.run_in_executor(
+                    self._executor, partial(self.store.put_many,
+                                            [item[:3] for item in batch],
+                                            fsync=self.fsync))
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (*_, future), record in zip(batch, records):
+                    if not future.done():
+                        future.set_result(record)
+            finally:
+                self._writing = 0
+
+    async def close(self):
+        """Write out everything queued, then stop the writer."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._executor.shutdown()
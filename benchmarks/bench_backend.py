@@ -0,0 +1,132 @@
+"""Load-test the backend endpoints against a local uvicorn instance.
+
+A uvicorn server is started on a free port in a temporary directory (so
+uploads and the result cache do not touch the checkout) unless ``--url``
+points at one that is already running. Each endpoint and payload size is
+hit ``--requests`` times from ``--concurrency`` keep-alive clients.
+
+    python benchmarks/bench_backend.py [--requests 500] [-c 8] [-o out.json]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from common import (ROOT, format_size, make_corpus, parse_size, percentile,
+                    write_results)
+
+ENDPOINTS = ("/upload_code/", "/analyze_code/")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, port):
+    env = dict(os.environ, PYTHONPATH=ROOT,
+               CODE_CLEANER_CACHE_DIR=os.path.join(workdir, "cache"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            requests.get(url + "/", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start within 30s")
+
+
+def load_test(url, endpoint, payload, total, concurrency):
+    local = threading.local()
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        response = session.post(url + endpoint, json=payload, timeout=60)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(concurrency)))  # warm connections
+        start = time.perf_counter()
+        samples = list(executor.map(one, range(total)))
+        wall = time.perf_counter() - start
+    latencies = sorted(s[0] for s in samples)
+    errors = sum(1 for s in samples if s[1] != 200)
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": wall,
+        "throughput": total / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="use a running backend instead")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--sizes", default="1K,100K",
+                        help="payload sizes (default 1K,100K)")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-o", "--output", help="write JSON results here")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    endpoints = args.endpoints.split(",")
+    with tempfile.TemporaryDirectory(prefix="cc-bench-") as workdir:
+        process = None
+        url = args.url
+        if url is None:
+            process, url = start_server(workdir, free_port())
+        results = []
+        try:
+            print(f"{'endpoint':<16}{'size':>6}{'req/s':>9}{'p50 ms':>9}"
+                  f"{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+            for endpoint in endpoints:
+                for size in sizes:
+                    payload = {"cleaned_code": make_corpus(size)}
+                    row = load_test(url, endpoint, payload, args.requests,
+                                    args.concurrency)
+                    print(f"{endpoint:<16}{format_size(size):>6}"
+                          f"{row['throughput']:>9.1f}{row['p50_ms']:>9.1f}"
+                          f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                          f"{row['errors']:>8}")
+                    sys.stdout.flush()
+                    results.append(dict(row, endpoint=endpoint, size=size,
+                                        concurrency=args.concurrency))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    if args.output:
+        write_results(args.output, "backend", results, sizes=sizes,
+                      concurrency=args.concurrency, requests=args.requests,
+                      url=args.url or "local uvicorn")
+
+
+if __name__ == "__main__":
+    main()
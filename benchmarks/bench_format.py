@@ -0,0 +1,77 @@
+"""Compare cold and warm autopep8/isort formatting throughput.
+
+"cold" calls ``autopep8.fix_code`` and ``isort.api.sort_code_string`` per
+file, the way the apps used to; "warm" reuses one ``Formatter``; "pool"
+maps ``format_code`` over a process pool with one warm worker per CPU, as
+batch mode does.
+
+    python benchmarks/bench_format.py [-n 400] [--isort-only]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cleaner_format import (HAS_AUTOPEP8, HAS_ISORT, Formatter,  # noqa: E402
+                            format_code, load_optional, warm_up)
+
+SAMPLE = '''import sys
+import os
+from collections import OrderedDict, defaultdict
+
+
+def handler_{i}(event,context):
+    items=[1,2 ,3]
+    if event :
+        return {{'ok':True,'n':len(items)}}
+    return None
+'''
+
+
+def rate(count, seconds):
+    return f"{count / seconds:>9.1f} files/s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--files", type=int, default=400)
+    parser.add_argument("--isort-only", action="store_true")
+    args = parser.parse_args(argv)
+    if not (HAS_ISORT and (HAS_AUTOPEP8 or args.isort_only)):
+        sys.exit("autopep8 and isort must be installed")
+    use_autopep8 = not args.isort_only
+    sources = [SAMPLE.format(i=i) for i in range(args.files)]
+    autopep8 = load_optional("autopep8")
+    isort = load_optional("isort")
+
+    start = time.perf_counter()
+    for code in sources:
+        if use_autopep8:
+            code = autopep8.fix_code(code)
+        isort.api.sort_code_string(code)
+    print(f"cold              {rate(len(sources), time.perf_counter() - start)}")
+
+    formatter = Formatter()
+    formatter.format(sources[0], use_autopep8, True)
+    start = time.perf_counter()
+    for code in sources:
+        formatter.format(code, use_autopep8, True)
+    print(f"warm              {rate(len(sources), time.perf_counter() - start)}")
+
+    workers = os.cpu_count() or 1
+    work = partial(format_code, use_autopep8=use_autopep8, sort_imports=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up) as pool:
+        list(pool.map(work, sources[:workers]))
+        start = time.perf_counter()
+        list(pool.map(work, sources, chunksize=32))
+        elapsed = time.perf_counter() - start
+    print(f"pool ({workers} workers) {rate(len(sources), elapsed)}  "
+          f"{rate(len(sources) / workers, elapsed)} per core")
+
+
+if __name__ == "__main__":
+    main()
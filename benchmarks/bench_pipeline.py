@@ -0,0 +1,149 @@
+"""Time each cleaning pass, the fused pipeline and the formatters.
+
+Every (size, profile) pair gets a synthetic corpus from ``common.make_corpus``.
+Each pass is timed alone, then all of them together, then autopep8 and
+isort on the cleaned text for corpora up to ``--format-max``. The best of
+``--repeat`` runs is kept. Passes the original app had are also timed
+the way its ``clean_code`` ran them, one list pass each, and the
+"vs base" column is our time over that one.
+
+    python benchmarks/bench_pipeline.py [--sizes 1K,100K,10M] [-o out.json]
+"""
+import argparse
+import re
+import sys
+import time
+
+from common import (PROFILES, format_size, make_corpus, parse_size,
+                    write_results)
+
+from cleaner_engine import clean, clean_bytes
+from cleaner_format import HAS_AUTOPEP8, HAS_ISORT, Formatter
+
+DEFAULT_SIZES = "1K,10K,100K,1M,10M,100M"
+
+# name -> keyword arguments for clean(); each pass on its own, then fused
+PASSES = {
+    "passthrough": dict(trim_trailing=False, collapse_blank=False),
+    "trim": dict(trim_trailing=True, collapse_blank=False),
+    "comments-line": dict(trim_trailing=False, collapse_blank=False,
+                          remove_comments=True),
+    "comments-tokenize": dict(trim_trailing=False, collapse_blank=False,
+                              remove_comments=True, comment_mode="tokenize"),
+    "collapse": dict(trim_trailing=False, collapse_blank=True),
+    "all": dict(trim_trailing=True, collapse_blank=True, remove_comments=True),
+    "all-tokenize": dict(trim_trailing=True, collapse_blank=True,
+                         remove_comments=True, comment_mode="tokenize"),
+    # through clean_bytes on the encoded corpus instead of clean()
+    "trim+collapse-bytes": dict(trim_trailing=True, collapse_blank=True),
+}
+
+
+def baseline_clean(raw, remove_comments=False, trim_trailing=True,
+                   collapse_blank=True, comment_mode="line"):
+    """The line passes as the original app's ``clean_code`` ran them."""
+    cleaned = raw.splitlines()
+    if trim_trailing:
+        cleaned = [line.rstrip() for line in cleaned]
+    if remove_comments:
+        new_lines = []
+        for line in cleaned:
+            if re.match(r'^\s*#', line):
+                continue
+            new_lines.append(line)
+        cleaned = new_lines
+    if collapse_blank:
+        new_lines = []
+        blank_count = 0
+        for line in cleaned:
+            if line.strip() == "":
+                blank_count += 1
+            else:
+                blank_count = 0
+            if blank_count <= 1:
+                new_lines.append(line)
+        cleaned = new_lines
+    return "\n".join(cleaned).rstrip() + "\n"
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"comma-separated corpus sizes (default {DEFAULT_SIZES})")
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help="comment/blank-line profiles to run")
+    parser.add_argument("--passes", default=",".join(PASSES))
+    parser.add_argument("-n", "--repeat", type=int, default=3,
+                        help="runs per measurement; corpora over 10M run once")
+    parser.add_argument("--format-max", default="100K",
+                        help="largest corpus to run autopep8/isort on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write JSON results here")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    profiles = args.profiles.split(",")
+    passes = args.passes.split(",")
+    format_max = parse_size(args.format_max)
+    formatter = Formatter()
+    results = []
+
+    print(f"{'size':>6} {'profile':<8} {'pass':<20}{'seconds':>10}{'MB/s':>9}"
+          f"{'vs base':>9}")
+    for size in sizes:
+        for profile in profiles:
+            comment_ratio, blank_run = PROFILES[profile]
+            source = make_corpus(size, comment_ratio, blank_run, args.seed)
+            data = source.encode("utf-8")
+            nbytes = len(data)
+            repeat = 1 if size > 10 * 1024 ** 2 else args.repeat
+            timings = []
+            for name in passes:
+                options = PASSES[name]
+                if name.endswith("-bytes"):
+                    run = lambda: clean_bytes(data, **options)  # noqa: E731
+                else:
+                    run = lambda: clean(source, **options)  # noqa: E731
+                base = None
+                if options.get("comment_mode", "line") == "line":
+                    base = best_of(repeat, lambda: baseline_clean(source, **options))
+                timings.append((name, best_of(repeat, run), base))
+            if size <= format_max:
+                cleaned = clean(source, **PASSES["all"])
+                if HAS_AUTOPEP8:
+                    formatter.autopep8(cleaned)
+                    timings.append(("autopep8", best_of(
+                        repeat, lambda: formatter.autopep8(cleaned)), None))
+                if HAS_ISORT:
+                    formatter.isort(cleaned)
+                    timings.append(("isort", best_of(
+                        repeat, lambda: formatter.isort(cleaned)), None))
+            for name, seconds, base in timings:
+                mb_s = nbytes / seconds / 1024 ** 2 if seconds else 0.0
+                ratio = f"{seconds / base:>8.2f}x" if base else f"{'':>9}"
+                print(f"{format_size(size):>6} {profile:<8} {name:<20}"
+                      f"{seconds:>10.4f}{mb_s:>9.1f}{ratio}")
+                results.append({"size": size, "bytes": nbytes,
+                                "profile": profile, "pass": name,
+                                "seconds": seconds, "mb_per_s": mb_s,
+                                "baseline_seconds": base, "repeat": repeat})
+            sys.stdout.flush()
+
+    if args.output:
+        write_results(args.output, "pipeline", results, sizes=sizes,
+                      profiles=profiles, repeat=args.repeat, seed=args.seed,
+                      format_max=format_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measure how long the Code Cleaner apps take to start.
+
+Each sample runs in a fresh interpreter. "lazy" is the app as shipped;
+"eager" first imports the optional dependencies the app now defers
+(autopep8, isort, requests), which is what startup used to pay. With a
+display available the window is also created and torn down.
+
+    python benchmarks/bench_startup.py [-n 10] [--no-window]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED = ("autopep8", "isort", "requests")
+
+SCRIPT = """
+import importlib, sys, time
+t0 = time.perf_counter()
+for name in {eager!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+module = importlib.import_module({module!r})
+t1 = time.perf_counter()
+if {window!r}:
+    if {module!r} == "code_cleaner_darkly":
+        import ttkbootstrap
+        root = ttkbootstrap.Window(themename="darkly")
+    else:
+        import tkinter
+        root = tkinter.Tk()
+    module.CodeCleanerApp(root)
+    root.update()
+    root.destroy()
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t0)
+"""
+
+
+def sample(module, eager, window):
+    code = SCRIPT.format(module=module, eager=DEFERRED if eager else (),
+                         window=window)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    imported, ready = out.split()
+    return float(imported), float(ready)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--repeat", type=int, default=10)
+    parser.add_argument("--no-window", action="store_true",
+                        help="only time the imports")
+    args = parser.parse_args(argv)
+    window = not args.no_window and bool(
+        os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"))
+
+    header = f"{'module':<22}{'mode':<7}{'import ms':>11}"
+    print(header + f"{'window ms':>11}" if window else header)
+    for module in ("code_cleaner", "code_cleaner_darkly"):
+        for eager in (True, False):
+            try:
+                runs = [sample(module, eager, window) for _ in range(args.repeat)]
+            except subprocess.CalledProcessError as e:
+                print(f"{module:<22}failed: {e.stderr.strip().splitlines()[-1]}")
+                break
+            imported = statistics.median(r[0] for r in runs) * 1000
+            ready = statistics.median(r[1] for r in runs) * 1000
+            mode = "eager" if eager else "lazy"
+            line = f"{module:<22}{mode:<7}{imported:>11.1f}"
+            print(line + f"{ready:>11.1f}" if window else line)
+
+
+if __name__ == "__main__":
+    main()
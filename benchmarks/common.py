@@ -0,0 +1,112 @@
+"""Shared helpers for the benchmark scripts: corpora, stats and results."""
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+# name -> (full-line comment ratio, longest blank-line run)
+PROFILES = {
+    "sparse": (0.05, 1),
+    "typical": (0.15, 3),
+    "dense": (0.40, 8),
+}
+
+_STATEMENTS = (
+    "value = compute(item, {n})",
+    "items.append(value * {n})",
+    "result[{n}] = 'text with # not a comment'",
+    "if value > {n}:\n    total += value",
+    "for index in range({n}):\n    total += index",
+    "total = total + {n}",
+    "logger.debug('step %s', {n})",
+)
+
+
+def parse_size(text):
+    """``"10K"`` -> 10240; plain numbers are bytes."""
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for unit in ("G", "M", "K"):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return str(size)
+
+
+def make_corpus(size, comment_ratio=0.15, blank_run=3, seed=0):
+    """Return deterministic, valid Python of at least ``size`` bytes.
+
+    Roughly ``comment_ratio`` of the lines are full-line comments, a third
+    as many carry an inline comment, trailing whitespace is sprinkled in,
+    and functions are separated by 1 to ``blank_run`` blank lines.
+    """
+    rng = random.Random(seed)
+    parts = ["import os\nimport sys\n\n"]
+    written = len(parts[0])
+    n = 0
+    while written < size:
+        n += 1
+        lines = [f"def function_{n}(item, items, result, total=0):  "]
+        for _ in range(rng.randint(3, 12)):
+            if rng.random() < comment_ratio:
+                lines.append(f"    # comment {n}: explains the next step")
+            statement = rng.choice(_STATEMENTS).format(n=n)
+            line = "    " + statement.replace("\n", "\n    ")
+            if rng.random() < comment_ratio / 3:
+                line += f"  # inline {n}"
+            if rng.random() < 0.2:
+                line += " " * rng.randint(1, 4)
+            lines.append(line)
+        lines.append("    return total")
+        block = "\n".join(lines) + "\n" * (1 + rng.randint(1, blank_run))
+        parts.append(block)
+        written += len(block)
+    return "".join(parts)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1,
+                max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path, suite, results, **params):
+    """Write ``results`` (a list of flat dicts) as JSON to ``path``."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"suite": suite, "meta": metadata(), "params": params,
+                   "results": results}, f, indent=2)
+        f.write("\n")
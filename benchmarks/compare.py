@@ -0,0 +1,67 @@
+"""Compare two JSON result files written by the benchmark scripts.
+
+Rows are matched on every key that is not a measurement; the change of
+each measurement is printed, and rows that got slower than ``--threshold``
+are flagged. Exits 1 if any regression was found.
+
+    python benchmarks/compare.py base.json new.json [--threshold 0.1]
+"""
+import argparse
+import json
+import sys
+
+# measurement -> True if bigger is better
+METRICS = {
+    "seconds": False,
+    "mb_per_s": True,
+    "throughput": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+IGNORED = {"bytes", "repeat", "requests", "errors", "max_ms"}
+
+
+def row_key(row):
+    return tuple(sorted((k, v) for k, v in row.items()
+                        if k not in METRICS and k not in IGNORED))
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+    base, new = load(args.base), load(args.new)
+    if base["suite"] != new["suite"]:
+        sys.exit(f"suites differ: {base['suite']} vs {new['suite']}")
+    print(f"{base['meta'].get('commit')} -> {new['meta'].get('commit')}")
+
+    base_rows = {row_key(r): r for r in base["results"]}
+    regressions = 0
+    for row in new["results"]:
+        old = base_rows.get(row_key(row))
+        if old is None:
+            continue
+        label = " ".join(str(v) for _, v in row_key(row))
+        for metric, higher_is_better in METRICS.items():
+            if metric not in row or not old.get(metric):
+                continue
+            change = (row[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > args.threshold else ""
+            regressions += bool(flag)
+            print(f"{label:<50} {metric:<11}{old[metric]:>12.4f}"
+                  f"{row[metric]:>12.4f}{change:>+9.1%}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import ast
+import io
+import tokenize
+
+BRANCH_NODES = (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While,
+                ast.ExceptHandler, ast.Assert, ast.comprehension)
+if hasattr(ast, "match_case"):
+    BRANCH_NODES += (ast.match_case,)
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def _comment_lines(code):
+    """Return the line numbers holding a comment, or None if tokenize fails."""
+    lines = set()
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == tokenize.COMMENT:
+                lines.add(tok.start[0])
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+    return lines
+
+
+def _complexity(func):
+    """McCabe complexity of ``func``, not counting nested functions or classes."""
+    score = 1
+    stack = list(ast.iter_child_nodes(func))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, FUNCTION_NODES + (ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(node, BRANCH_NODES):
+            score += 1
+            if isinstance(node, ast.comprehension):
+                score += len(node.ifs)
+        elif isinstance(node, ast.BoolOp):
+            score += len(node.values) - 1
+        elif isinstance(node, ast.Try):
+            score += bool(node.orelse)
+        stack.extend(ast.iter_child_nodes(node))
+    return score
+
+
+def _functions(tree):
+    result = []
+
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, FUNCTION_NODES):
+                name = prefix + child.name
+                result.append({"name": name, "line": child.lineno,
+                               "complexity": _complexity(child)})
+                visit(child, name + ".")
+            elif isinstance(child, ast.ClassDef):
+                visit(child, prefix + child.name + ".")
+            else:
+                visit(child, prefix)
+
+    visit(tree, "")
+    return result
+
+
+def _imports(tree):
+    modules = {}
+    statements = 0
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            statements += 1
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            statements += 1
+            names = ["." * node.level + (node.module or "")]
+        else:
+            continue
+        for name in names:
+            modules[name] = modules.get(name, 0) + 1
+    return {"statements": statements, "modules": modules}
+
+
+def analyze_source(code):
+    """Return line, comment, complexity and import metrics for ``code``.
+
+    ``syntax_error`` is None when ``ast.parse`` succeeds; otherwise it holds
+    the message and location, and the AST based metrics are left empty.
+    Runs in a worker process, so everything returned is plain data.
+    """
+    lines = code.splitlines()
+    blank = 0
+    runs = []
+    run = 0
+    for line in lines:
+        if line.strip():
+            if run:
+                runs.append(run)
+            run = 0
+        else:
+            blank += 1
+            run += 1
+    if run:
+        runs.append(run)
+
+    comment_lines = _comment_lines(code)
+    if comment_lines is None:
+        comments = sum(1 for line in lines if line.lstrip().startswith("#"))
+    else:
+        comments = len(comment_lines)
+    code_lines = len(lines) - blank
+
+    syntax_error = None
+    functions = []
+    imports = {"statements": 0, "modules": {}}
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        syntax_error = {"message": e.msg, "line": e.lineno, "offset": e.offset}
+    else:
+        functions = _functions(tree)
+        imports = _imports(tree)
+
+    return {
+        "lines": len(lines),
+        "characters": len(code),
+        "blank_lines": blank,
+        "comment_lines": comments,
+        "comment_ratio": round(comments / code_lines, 4) if code_lines else 0.0,
+        "blank_runs": {"count": len(runs),
+                       "longest": max(runs, default=0),
+                       "multi_line": sum(1 for r in runs if r > 1)},
+        "functions": functions,
+        "max_complexity": max((f["complexity"] for f in functions), default=0),
+        "imports": imports,
+        "syntax_error": syntax_error,
+    }
@@ -0,0 +1,131 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from cleaner_cache import cached_clean_source
+from cleaner_chunked import CHUNKED_MIN, clean_chunked
+from cleaner_diff import PatchWriter, iter_unified
+from cleaner_encoding import (ascii_compatible, decode, detect_format, encode,
+                              output_format)
+from cleaner_engine import clean_bytes, clean_ranges
+from cleaner_format import warm_up
+from cleaner_verify import verify as verify_clean
+
+SKIP_DIRS = {"__pycache__", "node_modules", "venv", ".venv"}
+# below this many files a process pool costs more than it saves
+SERIAL_MAX = 4
+
+
+def skip_dir(name):
+    """True for directories ``iter_python_files`` does not descend into."""
+    return name in SKIP_DIRS or name.startswith(".")
+
+
+def iter_python_files(paths):
+    """Yield every ``*.py`` file under ``paths`` (files or directories)."""
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if not skip_dir(d))
+            for name in sorted(filenames):
+                if name.endswith(".py"):
+                    yield os.path.join(dirpath, name)
+
+
+def clean_file(path, options, write=False, diff=False, cache=None,
+               split_passes=False, line_ranges=None, chunk_jobs=1):
+    """Clean one file, rewriting it from the first changed byte on if ``write``.
+
+    The file's encoding and newline style are kept. When only whitespace
+    rules are enabled the bytes are cleaned without decoding. With
+    ``line_ranges`` only those lines are cleaned (see ``clean_ranges``) and
+    the cache is not used. ``options["verify"]`` checks the result with
+    ``cleaner_verify.verify`` before anything is written. A file of
+    ``CHUNKED_MIN`` bytes or more is split across ``chunk_jobs`` processes
+    by ``clean_chunked`` when that can handle it and neither a diff nor
+    verification is wanted.
+
+    Returns ``(path, changed, size, diff_text, error, timings)``.
+    """
+    timings = []
+    options = dict(options)
+    verify = options.pop("verify", False)
+    try:
+        size = os.path.getsize(path)
+        if (chunk_jobs != 1 and size >= CHUNKED_MIN and line_ranges is None
+                and not (split_passes or diff or verify)):
+            try:
+                changed = clean_chunked(path, options, write=write,
+                                        jobs=chunk_jobs, timings=timings)
+            except UnicodeDecodeError:
+                changed = None
+            if changed is not None:
+                return path, changed, size, "", None, timings
+        with open(path, "rb") as f:
+            data = f.read()
+        fmt = detect_format(data)
+        cleaned = None
+        original = text = None
+        if (line_ranges is None and not split_passes
+                and ascii_compatible(fmt.encoding)):
+            cleaned = clean_bytes(data, timings=timings, newline=fmt.newline,
+                                  **options)
+        if cleaned is None:
+            original, fmt = decode(data, fmt)
+            if line_ranges is not None:
+                text = clean_ranges(original, line_ranges, timings=timings,
+                                    **options)
+            else:
+                text = cached_clean_source(original, cache=cache,
+                                           timings=timings,
+                                           split_passes=split_passes,
+                                           **options)
+            fmt = output_format(text, fmt)
+            cleaned = encode(text, fmt)
+        changed = cleaned != data
+        if changed and original is None:
+            original, text = decode(data, fmt)[0], decode(cleaned, fmt)[0]
+        if verify and changed:
+            verify_clean(original, text, cache, timings)
+        diff_text = ""
+        if changed and diff:
+            diff_text = "".join(iter_unified(original, text, path))
+        if changed and write:
+            with PatchWriter(path) as f:
+                f.write(cleaned)
+        return path, changed, len(data), diff_text, None, timings
+    except Exception as e:
+        return path, False, 0, "", str(e), timings
+
+
+def _clean_item(item, **kwargs):
+    path, line_ranges = item
+    return clean_file(path, line_ranges=line_ranges, **kwargs)
+
+
+def run_batch(files, options, write=False, diff=False, jobs=None,
+              cache=None, split_passes=False, ranges=None):
+    """Clean ``files`` across a process pool, yielding results in order.
+
+    ``ranges`` maps a file to the line ranges to clean in it; files it
+    leaves out (or maps to None) are cleaned whole.
+    """
+    files = list(files)
+    if not files:
+        return
+    items = [(path, None if ranges is None else ranges.get(path))
+             for path in files]
+    jobs = jobs or os.cpu_count() or 1
+    worker = partial(_clean_item, options=options, write=write, diff=diff,
+                     cache=cache, split_passes=split_passes)
+    if jobs == 1 or len(files) <= SERIAL_MAX:
+        # the few files there are may be huge; split those instead
+        yield from map(partial(worker, chunk_jobs=jobs), items)
+        return
+    chunksize = max(1, min(64, len(files) // (jobs * 4)))
+    warm = (options.get("use_autopep8", False), options.get("sort_imports", False))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=warm_up,
+                             initargs=warm) as executor:
+        yield from executor.map(worker, items, chunksize=chunksize)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import cleaner_format
+from cleaner_engine import clean_source
+from cleaner_profile import pass_record
+from cleaner_verify import verify as verify_clean
+
+CACHE_VERSION = "1"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+PRUNE_EVERY = 256
+
+
+def default_cache_dir():
+    path = os.environ.get("CODE_CLEANER_CACHE_DIR")
+    if path:
+        return path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "code_cleaner")
+
+
+def tool_versions():
+    versions = [f"cache={CACHE_VERSION}"]
+    if cleaner_format.HAS_AUTOPEP8:
+        versions.append(f"autopep8={cleaner_format.tool_version('autopep8')}")
+    if cleaner_format.HAS_ISORT:
+        versions.append(f"isort={cleaner_format.tool_version('isort')}")
+    return ";".join(versions)
+
+
+def cache_key(source, options):
+    h = hashlib.sha256()
+    h.update(tool_versions().encode("utf-8"))
+    h.update(b"\0")
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    h.update(b"\0")
+    h.update(source.encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """On-disk cache of cleaned output, evicted least-recently-used first.
+
+    Each entry is a small JSON file; its mtime is bumped on every hit so
+    that ``prune`` can drop the oldest entries once ``max_bytes`` is hit.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._puts = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key, entry):
+        path = self._path(key)
+        shard = os.path.dirname(path)
+        try:
+            os.makedirs(shard, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=shard, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self._puts += 1
+        if self._puts % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Delete the least recently used entries until under ``max_bytes``."""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                try:
+                    os.remove(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+
+
+def cached_clean_source(source, cache=None, stats=None, progress=None,
+                        timings=None, split_passes=False, verify=False,
+                        **options):
+    """``clean_source`` backed by ``cache``; returns the cleaned text.
+
+    A hit is reported in ``timings`` as a single ``"cache"`` pass. With
+    ``verify`` the result must parse to the same AST as ``source`` or
+    ``VerificationError`` is raised (see ``cleaner_verify``).
+    """
+    if cache is None:
+        cleaned = clean_source(source, stats=stats, progress=progress,
+                               timings=timings, split_passes=split_passes,
+                               **options)
+        if verify:
+            verify_clean(source, cleaned, timings=timings)
+        return cleaned
+    start = time.perf_counter()
+    key = cache_key(source, options)
+    entry = cache.get(key)
+    if entry is None:
+        counts = {}
+        cleaned = clean_source(source, stats=counts, progress=progress,
+                               timings=timings, split_passes=split_passes,
+                               **options)
+        entry = {"cleaned": cleaned, "stats": counts}
+        cache.put(key, entry)
+    elif timings is not None:
+        timings.append(pass_record("cache", start, source, entry["cleaned"],
+                                   entry["stats"].get("lines_in"),
+                                   entry["stats"].get("lines_out")))
+    if stats is not None:
+        stats.update(entry["stats"])
+    if verify:
+        verify_clean(source, entry["cleaned"], cache, timings)
+    return entry["cleaned"]
+
+
+def clean_job(source, cache, options):
+    """Job body for the cleaning pipeline; runs in a worker process."""
+    stats = {}
+    timings = []
+    cleaned = cached_clean_source(source, cache=cache, stats=stats,
+                                  timings=timings, **options)
+    return {"cleaned_code": cleaned, "stats": stats, "timings": timings}
@@ -0,0 +1,203 @@
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from cleaner_encoding import ascii_compatible, encode, sniff_file
+from cleaner_engine import (BLANK_RUN_RE, BYTES_RULES, LINE, bytes_strippable,
+                            get_pipeline, iter_lines)
+
+# below this a single process cleans the file faster than a pool
+CHUNKED_MIN = 32 * 1024 * 1024
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def chunk_bounds(data, chunk_size=CHUNK_SIZE):
+    """``(start, end)`` offsets splitting ``data`` after ``\\n`` bytes."""
+    bounds = []
+    start = 0
+    while start < len(data):
+        end = data.find(b"\n", start + chunk_size - 1)
+        end = len(data) if end == -1 else end + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def _pipeline(options, first):
+    # the BOM can only be at the start of the file
+    rules = tuple(r for r in options.get("rules", ())
+                  if first or r != "strip_bom")
+    return get_pipeline(options.get("remove_comments", False),
+                        options.get("trim_trailing", True),
+                        options.get("collapse_blank", True),
+                        options.get("comment_mode", "line"),
+                        options.get("use_autopep8", False),
+                        options.get("sort_imports", False), rules)
+
+
+def _split_bytes(body):
+    """``(head, last, tail)`` of trimmed ``body``; see ``_clean_chunk``."""
+    content = body.rstrip(b"\n")
+    if not content:
+        return b"", None, body
+    head_end = content.rfind(b"\n") + 1
+    return body[:head_end], content[head_end:], body[len(content) + 1:]
+
+
+def _clean_chunk(bounds, path, options, fmt):
+    """Clean one chunk of ``path`` with the line rules.
+
+    Returns ``(head, last, last_stripped, tail, first_blank, lines_in,
+    lines_out, comments_removed)`` with the text encoded: ``last`` is the
+    last non-blank line (None if there is none), ``head`` the lines before
+    it and ``tail`` the blank ones after, each line ending in a newline
+    except ``last``. ``clean_chunked`` needs the split to drop the file's
+    trailing blank lines and continue blank runs across chunks.
+    """
+    start, end = bounds
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        chunk = data[start:end]
+    pipeline = _pipeline(options, start == 0)
+    if ("trim" in pipeline.names and set(pipeline.names) <= BYTES_RULES
+            and chunk.count(b"\r") == chunk.count(b"\r\n")
+            and bytes_strippable(chunk)):
+        lines = chunk.split(b"\n")
+        if lines[-1] == b"":
+            lines.pop()
+        body = b"\n".join(map(bytes.rstrip, lines)) + b"\n" if lines else b""
+        if "collapse" in pipeline.names:
+            body = BLANK_RUN_RE.sub(b"\n\n", b"\n" + body)[1:]
+        head, last, tail = _split_bytes(body)
+        if fmt.newline != "\n":
+            newline = fmt.newline.encode("ascii")
+            head = head.replace(b"\n", newline)
+            tail = tail.replace(b"\n", newline)
+        return (head, last, last, tail, body.startswith(b"\n"), len(lines),
+                body.count(b"\n"), 0)
+    text = chunk.decode(fmt.encoding)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    counts = {}
+    out = list(pipeline.lines(iter_lines(text), counts))
+    index = len(out) - 1
+    while index >= 0 and out[index].strip() == "":
+        index -= 1
+    head = encode("".join(line + "\n" for line in out[:max(index, 0)]), fmt)
+    tail = encode("".join(line + "\n" for line in out[index + 1:]), fmt)
+    last = last_stripped = None
+    if index >= 0:
+        last = encode(out[index], fmt)
+        last_stripped = encode(out[index].rstrip(), fmt)
+    return (head, last, last_stripped, tail,
+            bool(out) and out[0].strip() == "", counts["lines_in"],
+            counts["lines_out"], counts["comments_removed"])
+
+
+def chunkable(fmt, options):
+    """True if ``clean_chunked`` can clean a file of format ``fmt``."""
+    if not ascii_compatible(fmt.encoding) or fmt.newline == "\r":
+        return False
+    # every chunk would be encoded with a BOM of its own
+    if fmt.encoding == "utf-8-sig":
+        return False
+    # removing comments may take the coding cookie with it
+    if fmt.declared and options.get("remove_comments", False):
+        return False
+    return all(rule.kind == LINE for rule in _pipeline(options, True).rules)
+
+
+class _Output:
+    """Temporary file next to ``path`` that notes whether it matches ``old``."""
+
+    def __init__(self, path, old):
+        fd, self.tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                        suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+        self._old = old
+        self.offset = 0
+        self.changed = False
+
+    def write(self, data):
+        end = self.offset + len(data)
+        if not self.changed and self._old[self.offset:end] != data:
+            self.changed = True
+        self.offset = end
+        self._file.write(data)
+
+    def close(self):
+        self._file.close()
+        if self.offset != len(self._old):
+            self.changed = True
+
+
+def clean_chunked(path, options, write=False, jobs=None,
+                  chunk_size=CHUNK_SIZE, timings=None):
+    """Clean one large file in parallel; returns whether it changed.
+
+    The file is memory-mapped and split after newlines into chunks that
+    worker processes clean with the line rules, reading their own slice
+    of the map. The results are stitched together in order: blank-line
+    runs continue across chunk edges and trailing blank lines are
+    dropped, as ``clean_source`` would. Output goes to a temporary file
+    that replaces ``path`` only if ``write`` and the contents changed.
+    Returns None, doing nothing, if ``chunkable`` says no.
+    """
+    fmt = sniff_file(path)
+    if not os.path.getsize(path) or not chunkable(fmt, options):
+        return None
+    start = time.perf_counter()
+    collapse = "collapse" in _pipeline(options, True).names
+    newline = fmt.newline.encode(fmt.encoding)
+    lines_in = lines_out = 0
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        size = len(data)
+        out = _Output(path, data)
+        try:
+            work = partial(_clean_chunk, path=path, options=options, fmt=fmt)
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                held = held_stripped = None
+                pending = b""
+                prev_blank = False
+                for (head, last, last_stripped, tail, first_blank, n_in,
+                     n_out, _) in executor.map(work, chunk_bounds(data, chunk_size)):
+                    lines_in += n_in
+                    if collapse and prev_blank and first_blank:
+                        if last is not None:
+                            head = head[head.index(b"\n") + 1:]
+                        else:
+                            tail = tail[tail.index(b"\n") + 1:]
+                        n_out -= 1
+                    lines_out += n_out
+                    if last is None:
+                        pending += tail
+                        prev_blank = prev_blank or n_out > 0
+                        continue
+                    if held is not None:
+                        out.write(held + newline)
+                    out.write(pending)
+                    out.write(head)
+                    held, held_stripped = last, last_stripped
+                    pending = tail
+                    prev_blank = bool(tail)
+            out.write((held_stripped or b"") + newline)
+        except BaseException:
+            out.close()
+            os.remove(out.tmp)
+            raise
+        out.close()
+    if write and out.changed:
+        shutil.copymode(path, out.tmp)
+        os.replace(out.tmp, path)
+    else:
+        os.remove(out.tmp)
+    if timings is not None:
+        timings.append({"pass": "clean", "seconds": time.perf_counter() - start,
+                        "lines_in": lines_in, "lines_out": lines_out,
+                        "chars_in": size, "chars_out": out.offset})
+    return out.changed
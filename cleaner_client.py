@@ -0,0 +1,143 @@
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BACKEND_URL = "http://127.0.0.1:8000"
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+class BackendClient:
+    """Keep-alive HTTP client for the CodeCleaner backend.
+
+    One pooled ``requests.Session`` is shared by every call, failed
+    connections are retried with exponential backoff, and the ``*_async``
+    methods run on a small thread pool so the UI thread never blocks on the
+    network. Read errors and 429/5xx answers are only retried for GETs: a
+    POST that may have reached the server is never sent again, since that
+    would store or queue its body twice. ``upload_bulk`` waits up to
+    ``bulk_timeout`` seconds for the server to write a whole batch.
+    """
+
+    def __init__(self, base_url=DEFAULT_BACKEND_URL, timeout=5, retries=3,
+                 backoff=0.5, pool_size=8, bulk_timeout=300):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.bulk_timeout = bulk_timeout
+        self.pool_size = pool_size
+        # the default allowed_methods leave out POST
+        retry = Retry(total=retries, connect=retries, read=retries,
+                      backoff_factor=backoff,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="backend")
+        return self._executor
+
+    def post(self, path, payload):
+        response = self.session.post(f"{self.base_url}{path}", json=payload,
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get(self, path):
+        response = self.session.get(f"{self.base_url}{path}",
+                                    timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def upload(self, cleaned_code):
+        return self.post("/upload_code/", {"cleaned_code": cleaned_code})
+
+    def upload_async(self, cleaned_code):
+        return self.executor.submit(self.upload, cleaned_code)
+
+    def upload_many_async(self, sources):
+        """Queue an upload per string in ``sources``; returns the futures."""
+        return [self.upload_async(code) for code in sources]
+
+    def upload_many(self, sources):
+        """Upload every string in ``sources`` over the pooled connections.
+
+        Returns a list of ``(result, error)`` pairs in input order.
+        """
+        results = []
+        for future in self.upload_many_async(sources):
+            try:
+                results.append((future.result(), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
+
+    def upload_bulk(self, files):
+        """Send ``(filename, cleaned_code)`` pairs in one NDJSON request.
+
+        The body is spooled to a temporary file rather than built in memory,
+        which also lets a retry after a failed connection rewind and resend
+        it. Connecting is limited by ``timeout`` and the answer by
+        ``bulk_timeout``.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as body:
+            for filename, code in files:
+                body.write(json.dumps({"filename": filename,
+                                       "cleaned_code": code}).encode("utf-8"))
+                body.write(b"\n")
+            body.seek(0)
+            response = self.session.post(
+                f"{self.base_url}/upload_bulk/", data=body,
+                headers={"Content-Type": "application/x-ndjson"},
+                timeout=(self.timeout, self.bulk_timeout))
+        response.raise_for_status()
+        return response.json()
+
+    def upload_bulk_async(self, files):
+        return self.executor.submit(self.upload_bulk, files)
+
+    def submit_clean(self, code, **options):
+        """Queue ``code`` for cleaning on the backend; returns the job id."""
+        return self.post("/jobs/", dict(options, code=code))["job_id"]
+
+    def job_status(self, job_id):
+        return self.get(f"/jobs/{job_id}")
+
+    def job_result(self, job_id):
+        return self.get(f"/jobs/{job_id}/result")
+
+    def clean_remote(self, code, poll_interval=0.2, timeout=None, **options):
+        """Clean ``code`` on the backend job pool and wait for the result.
+
+        Returns ``(cleaned_code, stats)``; raises ``TimeoutError`` if the job
+        is still unfinished after ``timeout`` seconds.
+        """
+        job_id = self.submit_clean(code, **options)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.job_status(job_id)["status"]
+            if status in ("done", "error"):
+                result = self.job_result(job_id)
+                return result["cleaned_code"], result["stats"]
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} still {status}")
+            time.sleep(poll_interval)
+
+    def clean_remote_async(self, code, **options):
+        return self.executor.submit(self.clean_remote, code, **options)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
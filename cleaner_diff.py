@@ -0,0 +1,121 @@
+import codecs
+import difflib
+
+COMPARE_CHUNK = 64 * 1024
+
+
+def common_prefix(a, b):
+    """Length of the longest common prefix of two bytes objects."""
+    va, vb = memoryview(a), memoryview(b)
+    n = min(len(a), len(b))
+    start = 0
+    while start < n:
+        end = min(start + COMPARE_CHUNK, n)
+        if va[start:end] == vb[start:end]:
+            start = end
+            continue
+        while end - start > 1:
+            mid = (start + end) // 2
+            if va[start:mid] == vb[start:mid]:
+                start = mid
+            else:
+                end = mid
+        return start
+    return n
+
+
+class PatchWriter:
+    """Writable file object that only rewrites ``path`` where it changes.
+
+    Text written is compared with the current contents as it arrives and
+    nothing hits the disk until the first byte that differs; from there on
+    the rest is written over the old contents and the file is truncated on
+    ``close``. A file whose contents come out identical is not touched at
+    all, so it keeps its mtime. ``changed`` tells which happened.
+
+    Text is written with ``newline`` line endings in ``encoding``; bytes
+    are written as they are.
+    """
+
+    def __init__(self, path, encoding="utf-8", newline="\n"):
+        self.path = path
+        self.encoding = encoding
+        self.newline = newline
+        self._encode = codecs.getincrementalencoder(encoding)().encode
+        self.changed = False
+        try:
+            self._file = open(path, "r+b")
+        except FileNotFoundError:
+            self._file = open(path, "w+b")
+            self.changed = True
+
+    def write(self, text):
+        if isinstance(text, bytes):
+            data = text
+        elif self.newline != "\n":
+            data = self._encode(text.replace("\n", self.newline))
+        else:
+            data = self._encode(text)
+        if not self.changed:
+            old = self._file.read(len(data))
+            offset = common_prefix(old, data)
+            if offset == len(data):
+                return len(text)
+            self._file.seek(offset - len(old), 1)
+            data = data[offset:]
+            self.changed = True
+        self._file.write(data)
+        return len(text)
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            if not self.changed and self._file.read(1):
+                self._file.seek(-1, 1)
+                self.changed = True
+            if self.changed:
+                self._file.truncate()
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def changed_runs(original, cleaned):
+    """``(tag, i1, i2, j1, j2)`` for every run of lines that differ."""
+    matcher = difflib.SequenceMatcher(None, original.splitlines(),
+                                      cleaned.splitlines())
+    return [op for op in matcher.get_opcodes() if op[0] != "equal"]
+
+
+def iter_unified(original, cleaned, path, context=3):
+    """Yield a unified diff of ``original`` -> ``cleaned`` line by line."""
+    return difflib.unified_diff(original.splitlines(keepends=True),
+                                cleaned.splitlines(keepends=True),
+                                fromfile=path, tofile=path, n=context)
+
+
+def highlight_changes(widget, runs, changed_tag="changed",
+                      removed_tag="removed"):
+    """Tag the lines of text ``widget`` that ``changed_runs`` found differ.
+
+    ``widget`` holds the cleaned text. Replaced and inserted lines get
+    ``changed_tag``; where lines were only deleted, the line before the
+    gap gets ``removed_tag``. Returns the number of changed runs. Only
+    the tagging is done here, so the diff can be computed off the UI
+    thread.
+    """
+    widget.tag_remove(changed_tag, "1.0", "end")
+    widget.tag_remove(removed_tag, "1.0", "end")
+    for tag, i1, i2, j1, j2 in runs:
+        if j2 > j1:
+            widget.tag_add(changed_tag, f"{j1 + 1}.0", f"{j2 + 1}.0")
+        else:
+            line = max(j1, 1)
+            widget.tag_add(removed_tag, f"{line}.0", f"{line}.end")
+    return len(runs)
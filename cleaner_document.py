@@ -0,0 +1,125 @@
+import mmap
+import os
+
+CHUNK_SIZE = 1 << 20
+SAVE_CHUNK_LINES = 20000
+PAGE_BYTES = 256 * 1024
+PAGED_THRESHOLD = 64 * 1024 * 1024
+
+
+def insert_chunked(widget, f, chunk_size=CHUNK_SIZE):
+    """Append the contents of text file ``f`` to ``widget`` chunk by chunk."""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        widget.insert("end", chunk)
+
+
+def write_chunked(widget, f, chunk_lines=SAVE_CHUNK_LINES):
+    """Write the contents of ``widget`` to ``f`` a block of lines at a time."""
+    last = int(widget.index("end-1c").split(".")[0])
+    for first in range(1, last + 1, chunk_lines):
+        stop = min(first + chunk_lines, last + 1)
+        end = f"{stop}.0" if stop <= last else "end-1c"
+        f.write(widget.get(f"{first}.0", end))
+
+
+def swap_slots(a, b):
+    """Exchange where two widgets are packed or gridded.
+
+    Both widgets must be managed the same way, and their parent must be an
+    ancestor of both slots. Contents, undo history and tags move with the
+    widgets, so nothing is copied.
+    """
+    if a.winfo_manager() == "grid":
+        info_a, info_b = a.grid_info(), b.grid_info()
+        a.grid_forget()
+        b.grid_forget()
+        a.grid(**info_b)
+        b.grid(**info_a)
+    else:
+        info_a, info_b = a.pack_info(), b.pack_info()
+        a.pack_forget()
+        b.pack_forget()
+        a.pack(**info_b)
+        b.pack(**info_a)
+    a.lift()
+    b.lift()
+
+
+class PagedFile:
+    """Read-only, memory-mapped view of a large file split into pages.
+
+    Pages are about ``page_bytes`` long and always start and end on line
+    boundaries, so no line index has to be built up front.
+    """
+
+    def __init__(self, path, page_bytes=PAGE_BYTES, encoding="utf-8"):
+        self.path = path
+        self.page_bytes = page_bytes
+        self.encoding = encoding
+        self.size = os.path.getsize(path)
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if self.size else None
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.size // self.page_bytes))
+
+    def _boundary(self, offset):
+        if offset <= 0:
+            return 0
+        if offset >= self.size:
+            return self.size
+        newline = self._map.find(b"\n", offset - 1)
+        return self.size if newline == -1 else newline + 1
+
+    def page(self, number):
+        if self._map is None:
+            return ""
+        start = self._boundary(number * self.page_bytes)
+        end = self._boundary((number + 1) * self.page_bytes)
+        text = self._map[start:end].decode(self.encoding, "replace")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class PagedView:
+    """Shows one page of a ``PagedFile`` at a time in a read-only Text."""
+
+    def __init__(self, widget, document):
+        self.widget = widget
+        self.document = document
+        self.number = 0
+        self.show(0)
+
+    def show(self, number):
+        self.number = max(0, min(number, self.document.page_count - 1))
+        self.widget.configure(state="normal")
+        self.widget.delete("1.0", "end")
+        self.widget.insert("1.0", self.document.page(self.number))
+        self.widget.configure(state="disabled")
+
+    def next_page(self):
+        self.show(self.number + 1)
+
+    def prev_page(self):
+        self.show(self.number - 1)
+
+    @property
+    def label(self):
+        return f"page {self.number + 1}/{self.document.page_count}"
+
+    def close(self):
+        self.widget.configure(state="normal")
+        self.widget.delete("1.0", "end")
+        self.document.close()
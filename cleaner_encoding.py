@@ -0,0 +1,111 @@
+import codecs
+import io
+import re
+import tokenize
+from collections import namedtuple
+
+# Latin-1 maps every byte to a character and back, so undeclared non-UTF-8
+# source still round-trips byte for byte.
+FALLBACK_ENCODING = "latin-1"
+SNIFF_BYTES = 64 * 1024
+COOKIE_RE = re.compile(r"^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)")
+
+# ``declared``: the encoding comes from a coding cookie
+SourceFormat = namedtuple("SourceFormat", "encoding newline declared")
+DEFAULT_FORMAT = SourceFormat("utf-8", "\n", False)
+
+
+def detect_newline(data):
+    """Style of the first line ending in ``data``; ``"\\n"`` if there is none."""
+    cr = data.find(b"\r")
+    if cr == -1:
+        return "\n"
+    lf = data.find(b"\n", 0, cr)
+    if lf != -1:
+        return "\n"
+    return "\r\n" if data[cr + 1:cr + 2] == b"\n" else "\r"
+
+
+def declared_encoding(text):
+    """Encoding named by a coding cookie in the first two lines, or None."""
+    for line in text.split("\n", 2)[:2]:
+        match = COOKIE_RE.match(line)
+        if match is not None:
+            return match.group(1)
+    return None
+
+
+def detect_format(data):
+    """Encoding and newline style of Python source ``data`` (bytes).
+
+    The encoding comes from a BOM (``utf-8-sig``, so it is written back)
+    or a PEP 263 cookie, as the interpreter reads it, and is UTF-8
+    otherwise. Only the first two lines are looked at; ``decode`` falls
+    back to latin-1 if the UTF-8 guess turns out wrong.
+    """
+    try:
+        encoding, lines = tokenize.detect_encoding(io.BytesIO(data).readline)
+    except SyntaxError:
+        return SourceFormat(FALLBACK_ENCODING, detect_newline(data), False)
+    declared = any(declared_encoding(line.decode("latin-1")) for line in lines)
+    return SourceFormat(encoding, detect_newline(data), declared)
+
+
+def sniff_file(path):
+    """``detect_format`` for a file, reading only its head."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    fmt = detect_format(head)
+    if fmt.encoding == "utf-8":
+        try:
+            head.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # a character cut in half at the end of the head is fine
+            if len(head) < SNIFF_BYTES or e.start < len(head) - 3:
+                fmt = fmt._replace(encoding=FALLBACK_ENCODING)
+    return fmt
+
+
+def ascii_compatible(encoding):
+    """True if whitespace and newlines are the ASCII bytes in ``encoding``.
+
+    ``utf-8-sig`` counts: past its BOM it is plain UTF-8.
+    """
+    try:
+        encoded = " \t\r\n#".encode(encoding)
+    except (LookupError, UnicodeError):
+        return False
+    return encoded in (b" \t\r\n#", codecs.BOM_UTF8 + b" \t\r\n#")
+
+
+def decode(data, fmt=None):
+    """Return ``(text, fmt)`` with every line ending turned into ``"\\n"``."""
+    fmt = fmt or detect_format(data)
+    try:
+        text = codecs.decode(data, fmt.encoding)
+    except UnicodeDecodeError:
+        if fmt.encoding != "utf-8":
+            raise
+        fmt = fmt._replace(encoding=FALLBACK_ENCODING)
+        text = codecs.decode(data, fmt.encoding)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text, fmt
+
+
+def output_format(text, fmt):
+    """Format to write cleaned ``text`` in, given its source's ``fmt``.
+
+    If cleaning removed the coding cookie the encoding came from, Python
+    will read the file as UTF-8, so that is what it is written in.
+    """
+    if fmt.declared and declared_encoding(text) is None:
+        return fmt._replace(encoding="utf-8", declared=False)
+    return fmt
+
+
+def encode(text, fmt=DEFAULT_FORMAT):
+    """Inverse of ``decode``: restore the line endings and encode."""
+    if fmt.newline != "\n":
+        text = text.replace("\n", fmt.newline)
+    return text.encode(fmt.encoding)
@@ -0,0 +1,328 @@
+import codecs
+import re
+import time
+from functools import lru_cache
+from itertools import chain, islice
+
+from cleaner_profile import pass_record
+from cleaner_rules import (BLOCK_LINES, FILE, LINE, TOKEN, Pipeline,
+                           rules_for)
+
+# rules clean_bytes can run
+BYTES_RULES = {"trim", "collapse"}
+BLANK_RUN_RE = re.compile(rb"\n\n\n+")
+# ASCII whitespace to str.rstrip but not to bytes.rstrip
+STR_ONLY_WHITESPACE = b"\x1c\x1d\x1e\x1f"
+# characters of a str split into lines at a time
+BLOCK_CHARS = 512 * 1024
+
+
+def iter_blocks(source, size=BLOCK_CHARS):
+    """Yield lists of lines without line endings from a str or text file.
+
+    A str is split about ``size`` characters at a time, a file
+    ``BLOCK_LINES`` lines at a time.
+    """
+    if isinstance(source, str):
+        start = 0
+        while start < len(source):
+            end = source.find("\n", start + size)
+            if end == -1:
+                end = len(source) - source.endswith("\n")
+            chunk = source[start:end]
+            start = end + 1
+            lines = chunk.split("\n")
+            if "\r" in chunk:
+                lines = [line.rstrip("\r") for line in lines]
+            yield lines
+        return
+    source = iter(source)
+    while True:
+        lines = [line.rstrip("\r\n") for line in islice(source, BLOCK_LINES)]
+        if not lines:
+            return
+        yield lines
+
+
+def iter_lines(source):
+    """Yield lines without line endings from a str or a text file object."""
+    return chain.from_iterable(iter_blocks(source))
+
+
+@lru_cache(maxsize=64)
+def get_pipeline(remove_comments=False, trim_trailing=True, collapse_blank=True,
+                 comment_mode="line", use_autopep8=False, sort_imports=False,
+                 rules=()):
+    """Compiled ``Pipeline`` for these options; ``rules`` is a tuple of names."""
+    return Pipeline(rules_for(remove_comments, trim_trailing, collapse_blank,
+                              comment_mode, use_autopep8, sort_imports, rules))
+
+
+def clean_lines(lines, remove_comments=False, trim_trailing=True,
+                collapse_blank=True, stats=None, comment_mode="line",
+                progress=None, rules=()):
+    """Run trim, comment removal, blank collapsing and ``rules`` in one pass.
+
+    With ``comment_mode="tokenize"`` comments are found by the tokenizer,
+    which also drops inline comments and leaves strings alone; otherwise
+    only lines matching ``COMMENT_RE`` are removed. ``rules`` names extra
+    rules from ``cleaner_rules.RULES``. ``progress`` is called as
+    ``progress("clean", lines_read)`` every ``BLOCK_LINES`` lines.
+    """
+    pipeline = get_pipeline(remove_comments, trim_trailing, collapse_blank,
+                            comment_mode, rules=tuple(rules))
+    return pipeline.lines(lines, stats, progress)
+
+
+def write_blocks(blocks, write):
+    """Write blocks of lines joined by newlines, dropping trailing blanks.
+
+    Equivalent to ``write("\\n".join(lines).rstrip() + "\\n")`` over all
+    the lines but only ever holds one block and the whitespace after the
+    last non-blank line.
+    """
+    pending = ""
+    for block in blocks:
+        text = "\n".join(block) + "\n"
+        content = text.rstrip()
+        if not content:
+            pending += text
+            continue
+        if pending:
+            write(pending)
+        write(content)
+        pending = text[len(content):]
+    write("\n")
+
+
+def clean(source, remove_comments=False, trim_trailing=True,
+          collapse_blank=True, out=None, stats=None, comment_mode="line",
+          progress=None, rules=()):
+    """Clean ``source`` (str or text file object).
+
+    Returns the cleaned text, or writes it to the ``out`` file object and
+    returns None when one is given. If ``stats`` is a dict it is filled with
+    ``lines_in``, ``lines_out`` and ``comments_removed``.
+    """
+    pipeline = get_pipeline(remove_comments, trim_trailing, collapse_blank,
+                            comment_mode, rules=tuple(rules))
+    blocks = pipeline.blocks(iter_blocks(source), stats, progress)
+    if out is not None:
+        write_blocks(blocks, out.write)
+        return None
+    parts = []
+    write_blocks(blocks, parts.append)
+    return "".join(parts)
+
+
+def _clean_split(source, pipeline, stats, progress, timings):
+    """``clean`` with every line rule run and timed on its own (slower)."""
+    lines = list(iter_lines(source))
+    lines_in = len(lines)
+    comments_removed = 0
+    for rule in pipeline.rules:
+        if rule.kind == FILE:
+            continue
+        start = time.perf_counter()
+        counts = {}
+        out = list(Pipeline([rule]).lines(lines, counts, progress))
+        comments_removed += counts["comments_removed"]
+        if timings is not None:
+            record = pass_record(rule.name, start, "", "", len(lines), len(out))
+            record["chars_in"] = sum(map(len, lines))
+            record["chars_out"] = sum(map(len, out))
+            timings.append(record)
+        lines = out
+    start = time.perf_counter()
+    parts = []
+    write_blocks([lines], parts.append)
+    cleaned = "".join(parts)
+    if timings is not None:
+        timings.append(pass_record("write", start, "", cleaned, len(lines)))
+    if stats is not None:
+        stats["lines_in"] = lines_in
+        stats["lines_out"] = len(lines)
+        stats["comments_removed"] = comments_removed
+    return cleaned
+
+
+def clean_source(source, remove_comments=False, trim_trailing=True,
+                 collapse_blank=True, use_autopep8=False, sort_imports=False,
+                 stats=None, comment_mode="line", progress=None, timings=None,
+                 split_passes=False, rules=()):
+    """Run the line rules and then the whole-file ones (the formatters).
+
+    If ``timings`` is a list, a ``pass_record`` is appended for each stage:
+    the fused line rules as ``"clean"``, then each formatter. With
+    ``split_passes`` the line rules run (and are timed) one at a time,
+    which costs extra passes over the text but shows which one is slow.
+    """
+    pipeline = get_pipeline(remove_comments, trim_trailing, collapse_blank,
+                            comment_mode, use_autopep8, sort_imports,
+                            tuple(rules))
+    if split_passes:
+        cleaned = _clean_split(source, pipeline, stats, progress, timings)
+    else:
+        counts = {} if stats is None else stats
+        start = time.perf_counter()
+        parts = []
+        write_blocks(pipeline.blocks(iter_blocks(source), counts, progress),
+                     parts.append)
+        cleaned = "".join(parts)
+        if timings is not None:
+            timings.append(pass_record(
+                "clean", start, source if isinstance(source, str) else "",
+                cleaned, counts["lines_in"], counts["lines_out"]))
+    return pipeline.format(cleaned, progress=progress, timings=timings)
+
+
+def bytes_strippable(data):
+    """True if ``bytes.rstrip`` trims the lines of ``data`` as ``str.rstrip``."""
+    return data.isascii() and not any(c in data for c in STR_ONLY_WHITESPACE)
+
+
+def clean_bytes(data, remove_comments=False, trim_trailing=True,
+                collapse_blank=True, use_autopep8=False, sort_imports=False,
+                stats=None, comment_mode="line", progress=None, timings=None,
+                rules=(), newline="\n"):
+    """``clean_source`` straight on undecoded ``data``; None if it cannot.
+
+    Trimming, with or without blank-line collapsing, is done with bytes
+    methods and one regex over the whole buffer instead of running the
+    rule loop per line. The source must be in an ASCII-compatible encoding.
+    A UTF-8 BOM is kept and line endings become ``newline``. Returns None
+    when other rules are enabled, ``data`` has lone ``\\r`` line breaks, or
+    it has characters the bytes methods would not strip like ``str.rstrip``:
+    anything past ASCII and the separators ``\\x1c``-``\\x1f``.
+    """
+    pipeline = get_pipeline(remove_comments, trim_trailing, collapse_blank,
+                            comment_mode, use_autopep8, sort_imports,
+                            tuple(rules))
+    if "trim" not in pipeline.names or not set(pipeline.names) <= BYTES_RULES:
+        return None
+    if b"\r" in data and data.count(b"\r") != data.count(b"\r\n"):
+        return None
+    start = time.perf_counter()
+    bom = codecs.BOM_UTF8 if data.startswith(codecs.BOM_UTF8) else b""
+    body = data[len(bom):]
+    if not bytes_strippable(body):
+        return None
+    lines = body.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+    lines_in = len(lines)
+    body = b"\n".join(map(bytes.rstrip, lines)) + b"\n" if lines else b""
+    if "collapse" in pipeline.names:
+        # the extra newline makes a run of blank lines at the top collapse too
+        body = BLANK_RUN_RE.sub(b"\n\n", b"\n" + body)[1:]
+    lines_out = body.count(b"\n")
+    body = body.rstrip(b"\n") + b"\n"
+    if newline != "\n":
+        body = body.replace(b"\n", newline.encode("ascii"))
+    cleaned = bom + body
+    if progress is not None:
+        progress("clean", lines_in)
+    if stats is not None:
+        stats.update(lines_in=lines_in, lines_out=lines_out,
+                     comments_removed=0)
+    if timings is not None:
+        timings.append(pass_record("clean", start, data, cleaned,
+                                   lines_in, lines_out))
+    return cleaned
+
+
+def merge_ranges(ranges):
+    """Sort 1-based inclusive ``(start, end)`` ranges, joining touching ones."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+
+def _spans(ranges, lines):
+    """0-based half-open spans for ``ranges``, widened over adjacent blanks."""
+    spans = []
+    for start, end in merge_ranges(ranges):
+        start, end = max(start - 1, 0), min(end, len(lines))
+        if start >= end:
+            continue
+        while start > 0 and lines[start - 1].strip() == "":
+            start -= 1
+        while end < len(lines) and lines[end].strip() == "":
+            end += 1
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(end, spans[-1][1]))
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def clean_ranges(source, line_ranges, remove_comments=False,
+                 trim_trailing=True, collapse_blank=True, use_autopep8=False,
+                 sort_imports=False, stats=None, comment_mode="line",
+                 progress=None, timings=None, rules=()):
+    """``clean_source`` restricted to the 1-based inclusive ``line_ranges``.
+
+    Lines outside the ranges are kept as they are, apart from blank lines
+    next to a range, which take part in collapsing it. Token rules still
+    read the whole file so a range starting inside a string is handled
+    right, autopep8 only fixes the cleaned ranges and isort sees the whole
+    file.
+    """
+    pipeline = get_pipeline(remove_comments, trim_trailing, collapse_blank,
+                            comment_mode, use_autopep8, sort_imports,
+                            tuple(rules))
+    counts = {} if stats is None else stats
+    start = time.perf_counter()
+    lines = list(iter_lines(source))
+    spans = _spans(line_ranges, lines)
+
+    view = lines
+    dropped = set()
+    for rule in pipeline.rules:
+        if rule.kind == TOKEN:
+            view = list(rule.stream(view, {}))
+            dropped.update(i for i, line in enumerate(view) if line is None)
+            view = ["" if line is None else line for line in view]
+    line_rules = Pipeline([rule for rule in pipeline.rules if rule.kind == LINE])
+
+    out = []
+    cleaned_ranges = []
+    comments_removed = trailing = 0
+    pos = 0
+    for first, stop in spans:
+        out.extend(lines[pos:first])
+        segment = [view[i] for i in range(first, stop) if i not in dropped]
+        comments_removed += stop - first - len(segment)
+        comments_removed += sum(1 for i in range(first, stop)
+                                if i not in dropped and view[i] != lines[i])
+        segment_counts = {}
+        segment = list(line_rules.lines(segment, segment_counts))
+        comments_removed += segment_counts["comments_removed"]
+        if stop == len(lines):
+            # what write_blocks does at the end of the file
+            while segment and segment[-1].strip() == "":
+                segment.pop()
+                trailing += 1
+            if segment:
+                segment[-1] = segment[-1].rstrip()
+        if segment:
+            cleaned_ranges.append((len(out) + 1, len(out) + len(segment)))
+        out.extend(segment)
+        pos = stop
+    out.extend(lines[pos:])
+
+    at_end = bool(spans) and spans[-1][1] == len(lines)
+    cleaned = "\n".join(out) + ("\n" if at_end or source.endswith("\n") else "")
+    counts.update(lines_in=len(lines), lines_out=len(out) + trailing,
+                  comments_removed=comments_removed)
+    if timings is not None:
+        timings.append(pass_record("clean", start, source, cleaned,
+                                   counts["lines_in"], counts["lines_out"]))
+    if not cleaned_ranges:
+        return cleaned
+    return pipeline.format(cleaned, progress=progress, timings=timings,
+                           line_ranges=cleaned_ranges)
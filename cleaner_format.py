@@ -0,0 +1,156 @@
+import copy
+import functools
+import importlib
+import importlib.metadata
+import importlib.util
+import io
+import time
+
+from cleaner_profile import pass_record
+
+HAS_AUTOPEP8 = importlib.util.find_spec("autopep8") is not None
+HAS_ISORT = importlib.util.find_spec("isort") is not None
+
+WARM_UP_SOURCE = "import sys\nimport os\n\ndef f(a,b):\n  return a+b\n"
+
+
+def load_optional(name):
+    """Import optional dependency ``name`` on first use; None if missing.
+
+    The formatters are slow to import, so they are only loaded once a
+    caller actually asks for them. ``HAS_*`` above only checks that they
+    can be found.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version(name):
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return "?"
+
+
+class Formatter:
+    """autopep8 and isort with their configuration resolved once.
+
+    ``autopep8.fix_code`` rebuilds its argument parser and options on every
+    call and isort builds a fresh config; here both are done the first time
+    a tool is used and reused afterwards. Missing tools leave code as is.
+    """
+
+    def __init__(self):
+        self._autopep8 = None
+        self._autopep8_options = None
+        self._isort = None
+        self._isort_config = None
+
+    def _load_autopep8(self):
+        if self._autopep8 is None and HAS_AUTOPEP8:
+            autopep8 = load_optional("autopep8")
+            if autopep8 is None:
+                return None
+            # Same normalisation fix_code applies to its options.
+            options = autopep8.parse_args([""], apply_config=False)
+            options.ignore = [opt.upper() for opt in options.ignore]
+            options.select = [opt.upper() for opt in options.select]
+            if not {"W50", "W503", "W504"} & set(options.ignore):
+                options.ignore.append("W50")
+            self._autopep8, self._autopep8_options = autopep8, options
+        return self._autopep8
+
+    def _load_isort(self):
+        if self._isort is None and HAS_ISORT:
+            isort = load_optional("isort")
+            if isort is None:
+                return None
+            if hasattr(isort, "Config"):
+                self._isort_config = isort.Config()
+            self._isort = isort
+        return self._isort
+
+    def autopep8(self, code, line_range=None):
+        """Fix ``code``; only lines ``start..end`` (1-based) if ``line_range``."""
+        autopep8 = self._load_autopep8()
+        if autopep8 is None:
+            return code
+        options = self._autopep8_options
+        if line_range is not None:
+            options = copy.copy(options)
+            options.line_range = list(line_range)
+        # split like fix_code: str.splitlines would also break at \x0c,
+        # \x85, \u2028 etc. inside string literals
+        return autopep8.fix_lines(io.StringIO(code).readlines(), options)
+
+    def isort(self, code):
+        isort = self._load_isort()
+        if isort is None:
+            return code
+        isort_api = getattr(isort, "api", isort)
+        try:
+            if self._isort_config is not None:
+                return isort_api.sort_code_string(code, config=self._isort_config)
+            if hasattr(isort_api, "sort_code_string"):
+                return isort_api.sort_code_string(code)
+            if hasattr(isort_api, "sort_code"):
+                return isort_api.sort_code(code)
+            if hasattr(isort_api, "code"):
+                return isort_api.code(code)
+            if hasattr(isort, "sort_code_string"):
+                return isort.sort_code_string(code)
+            if hasattr(isort, "sort_code"):
+                return isort.sort_code(code)
+        except Exception:
+            return code
+        return code
+
+    def format(self, code, use_autopep8=False, sort_imports=False,
+               progress=None, timings=None):
+        for name, enabled, run in (
+                ("autopep8", use_autopep8 and HAS_AUTOPEP8, self.autopep8),
+                ("isort", sort_imports and HAS_ISORT, self.isort)):
+            if not enabled:
+                continue
+            if progress is not None:
+                progress(name, 0)
+            start = time.perf_counter()
+            formatted = run(code)
+            if timings is not None:
+                timings.append(pass_record(name, start, code, formatted))
+            code = formatted
+        return code
+
+
+_formatter = None
+
+
+def get_formatter():
+    """Return this process's shared ``Formatter``."""
+    global _formatter
+    if _formatter is None:
+        _formatter = Formatter()
+    return _formatter
+
+
+def sort_code_with_isort(code: str) -> str:
+    return get_formatter().isort(code)
+
+
+def format_code(code, use_autopep8=False, sort_imports=False, progress=None,
+                timings=None):
+    return get_formatter().format(code, use_autopep8=use_autopep8,
+                                  sort_imports=sort_imports, progress=progress,
+                                  timings=timings)
+
+
+def warm_up(use_autopep8=True, sort_imports=True):
+    """Load and configure the formatters now instead of on the first file.
+
+    Meant as a process pool ``initializer``.
+    """
+    format_code(WARM_UP_SOURCE, use_autopep8=use_autopep8,
+                sort_imports=sort_imports)
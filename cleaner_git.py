@@ -0,0 +1,89 @@
+import os
+import re
+import subprocess
+
+HUNK_RE = re.compile(r"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class GitError(Exception):
+    pass
+
+
+def run_git(args, cwd=None):
+    try:
+        result = subprocess.run(["git", "-c", "core.quotePath=false", *args],
+                                cwd=cwd, capture_output=True, text=True)
+    except OSError as e:
+        raise GitError(f"cannot run git: {e}") from e
+    if result.returncode != 0:
+        raise GitError(result.stderr.strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def repo_root(cwd=None):
+    return run_git(["rev-parse", "--show-toplevel"], cwd).strip()
+
+
+def parse_diff(text):
+    """Map each file in a ``--no-prefix -U0`` diff to its new-side ranges.
+
+    Ranges are 1-based and inclusive. A hunk that only deletes lines gives
+    the lines on both sides of the gap, since joining them can leave
+    something to clean (a doubled blank line, say).
+    """
+    ranges = {}
+    current = None
+    # old and new lines of the current hunk still to come; "+++ x" can be
+    # an added line as well as a file header
+    old_left = new_left = 0
+    for line in text.split("\n"):
+        if old_left or new_left:
+            if line[:1] in ("-", " "):
+                old_left -= 1
+            if line[:1] in ("+", " "):
+                new_left -= 1
+            continue
+        if line.startswith("+++ "):
+            name = line[4:]
+            current = None if name == "/dev/null" else ranges.setdefault(name, [])
+            continue
+        match = HUNK_RE.match(line)
+        if match is None:
+            continue
+        old_left, start, new_left = (1 if n is None else int(n)
+                                     for n in match.groups())
+        if current is None:
+            continue
+        if new_left:
+            current.append((start, start + new_left - 1))
+        else:
+            current.append((max(start, 1), start + 1))
+    return ranges
+
+
+def changed_lines(since="HEAD", staged=False, paths=(), cwd=None):
+    """Map every changed ``*.py`` file to the line ranges changed since ``since``.
+
+    Compares the working tree, or the index with ``staged``, against the
+    ref ``since``; only local git is used. Keys are absolute paths. New
+    untracked files map to None (clean the whole file). With ``staged``
+    the ranges are for the staged contents, so the working tree should
+    match the index, as it does under pre-commit hooks.
+    """
+    root = repo_root(cwd)
+    args = ["diff", "--no-color", "--no-ext-diff", "--no-prefix", "-U0",
+            "--diff-filter=ACMR"]
+    if staged:
+        args.append("--cached")
+    changed = {}
+    for name, ranges in parse_diff(run_git(args + [since, "--", *paths],
+                                           cwd)).items():
+        if name.endswith(".py") and ranges:
+            changed[os.path.join(root, name)] = ranges
+    if not staged:
+        untracked = run_git(["ls-files", "--others", "--exclude-standard",
+                             "--full-name", "-z", "--", *paths], cwd)
+        for name in untracked.split("\0"):
+            if name.endswith(".py"):
+                changed[os.path.join(root, name)] = None
+    return changed
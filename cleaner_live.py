@@ -0,0 +1,338 @@
+from cleaner_engine import clean_lines
+from cleaner_rules import COMMENT_RE
+
+FULL = "full"
+
+
+# lines per block of LiveCleaner state
+BLOCK_SIZE = 512
+
+
+class _Fenwick:
+    """Prefix sums over a list of counts with point updates."""
+
+    def __init__(self, counts):
+        tree = [0] + list(counts)
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def add(self, index, delta):
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        """Sum of the first ``index`` counts."""
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, target):
+        """``(i, rest)`` for the count ``i`` that holds position ``target``."""
+        pos = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            probe = pos + step
+            if probe < len(self._tree) and self._tree[probe] <= target:
+                pos = probe
+                target -= self._tree[probe]
+            step >>= 1
+        return pos, target
+
+
+class _LineBlocks:
+    """``(cleaned, kept, after_blank)`` per input line, stored in blocks.
+
+    Blocks of up to twice ``BLOCK_SIZE`` lines keep edits local, and
+    Fenwick trees over the block sizes and kept counts find a line and
+    count the kept lines before it in O(log n).
+    """
+
+    def __init__(self, items):
+        items = list(items)
+        self._blocks = [items[i:i + BLOCK_SIZE]
+                        for i in range(0, len(items), BLOCK_SIZE)] or [[]]
+        self._sizes = [len(block) for block in self._blocks]
+        self._kept = [sum(item[1] for item in block) for block in self._blocks]
+        self._reindex()
+
+    def _reindex(self):
+        self._size_tree = _Fenwick(self._sizes)
+        self._kept_tree = _Fenwick(self._kept)
+        self._len = sum(self._sizes)
+
+    def __len__(self):
+        return self._len
+
+    def _locate(self, index):
+        if index >= self._len:
+            return len(self._blocks) - 1, self._sizes[-1]
+        return self._size_tree.find(index)
+
+    def __getitem__(self, index):
+        block, offset = self._locate(index)
+        return self._blocks[block][offset]
+
+    def __setitem__(self, index, item):
+        block, offset = self._locate(index)
+        delta = item[1] - self._blocks[block][offset][1]
+        self._blocks[block][offset] = item
+        if delta:
+            self._kept[block] += delta
+            self._kept_tree.add(block, delta)
+
+    def kept_before(self, index):
+        block, offset = self._locate(index)
+        return self._kept_tree.prefix(block) + \
+            sum(item[1] for item in self._blocks[block][:offset])
+
+    def replace(self, start, stop, items):
+        """Put ``items`` in place of lines ``[start, stop)``; returns those."""
+        first, first_offset = self._locate(start)
+        last, last_offset = self._locate(stop)
+        block = self._blocks[first]
+        if first == last and 0 < len(block) + len(items) - (stop - start) \
+                <= 2 * BLOCK_SIZE:
+            old = block[first_offset:last_offset]
+            block[first_offset:last_offset] = items
+            size = len(items) - len(old)
+            kept = sum(item[1] for item in items) - sum(item[1] for item in old)
+            self._sizes[first] += size
+            self._kept[first] += kept
+            self._size_tree.add(first, size)
+            self._kept_tree.add(first, kept)
+            self._len += size
+            return old
+        merged = [item for block in self._blocks[first:last + 1] for item in block]
+        stop_offset = stop - start + first_offset
+        old = merged[first_offset:stop_offset]
+        merged[first_offset:stop_offset] = items
+        blocks = [merged[i:i + BLOCK_SIZE]
+                  for i in range(0, len(merged), BLOCK_SIZE)]
+        if not blocks and len(self._blocks) == last - first + 1:
+            blocks = [[]]
+        self._blocks[first:last + 1] = blocks
+        self._sizes[first:last + 1] = [len(block) for block in blocks]
+        self._kept[first:last + 1] = [sum(item[1] for item in block)
+                                      for block in blocks]
+        self._reindex()
+        return old
+
+
+class LiveCleaner:
+    """Line-pass model that re-cleans only the lines touched by an edit.
+
+    Keeps, for every input line, its cleaned text (None if it is a removed
+    comment), whether it survives blank-line collapsing and whether the
+    last cleaned line up to it is blank. Trimming and comment removal only
+    look at the line itself and a blank line only depends on the line
+    before it, so an edit needs to revisit the edited lines plus the
+    removed comments and first surviving line after them. Output offsets
+    come from prefix counts, so an update costs O(edit + log n). The
+    formatters and the final trailing-blank trim are left to a full clean.
+    """
+
+    def __init__(self, remove_comments=False, trim_trailing=True,
+                 collapse_blank=True):
+        self.remove_comments = remove_comments
+        self.trim_trailing = trim_trailing
+        self.collapse_blank = collapse_blank
+        self.lines = _LineBlocks(())
+
+    def _clean_line(self, line):
+        if self.trim_trailing:
+            line = line.rstrip()
+        if self.remove_comments and COMMENT_RE.match(line):
+            return None
+        return line
+
+    def _link(self, line, after_blank):
+        """``(cleaned, kept, after_blank)`` for ``line`` after ``after_blank``."""
+        if line is None:
+            return None, 0, after_blank
+        blank = line.strip() == ""
+        return line, 0 if (self.collapse_blank and blank and after_blank) else 1, blank
+
+    def _link_all(self, lines, after_blank):
+        items = []
+        for line in lines:
+            item = self._link(self._clean_line(line), after_blank)
+            after_blank = item[2]
+            items.append(item)
+        return items
+
+    def reset(self, lines):
+        """Load the whole input; returns the output lines."""
+        items = self._link_all(lines, False)
+        self.lines = _LineBlocks(items)
+        return [line for line, keep, _ in items if keep]
+
+    def update(self, start, old_count, new_lines):
+        """Replace input lines ``[start, start + old_count)`` by ``new_lines``.
+
+        Returns ``(out_start, out_old_count, out_new_lines)``: the output
+        lines to replace and what to put in their place.
+        """
+        lines = self.lines
+        out_start = lines.kept_before(start)
+        after_blank = lines[start - 1][2] if start else False
+        items = self._link_all(new_lines, after_blank)
+        old = lines.replace(start, start + old_count, items)
+        out_old_count = sum(item[1] for item in old)
+        out_new_lines = [line for line, keep, _ in items if keep]
+        if items:
+            after_blank = items[-1][2]
+        # the new state runs on through removed comments to the next line
+        index = start + len(items)
+        while index < len(lines):
+            item = lines[index]
+            relinked = self._link(item[0], after_blank)
+            if relinked == item:
+                break
+            lines[index] = relinked
+            if item[0] is not None:
+                out_old_count += item[1]
+                if relinked[1]:
+                    out_new_lines.append(relinked[0])
+                break
+            index += 1
+        return out_start, out_old_count, out_new_lines
+
+
+class TextEditHook:
+    """Reports which lines of a Tk Text widget each edit touched.
+
+    The widget's Tcl command is renamed and replaced by a proxy, so every
+    ``insert``/``delete``/``replace`` (typing, pasting, programmatic
+    changes) calls ``on_edit(start, old_count, new_count)`` with 0-based
+    line numbers. Undo and redo bypass the command, so they report FULL.
+    """
+
+    def __init__(self, widget, on_edit):
+        self.widget = widget
+        self.on_edit = on_edit
+        self._orig = widget._w + "_orig"
+        widget.tk.call("rename", widget._w, self._orig)
+        widget.tk.createcommand(widget._w, self._proxy)
+
+    def _call(self, *args):
+        return self.widget.tk.call((self._orig,) + args)
+
+    def _line(self, index):
+        return int(str(self._call("index", index)).split(".")[0])
+
+    def _proxy(self, *args):
+        cmd = args[0] if args else ""
+        if cmd not in ("insert", "delete", "replace"):
+            result = self._call(*args)
+            if cmd == "edit" and len(args) > 1 and args[1] in ("undo", "redo"):
+                self.on_edit(FULL)
+            return result
+        count = self._line("end-1c")
+        first = min(self._line(args[1]), count)
+        if cmd == "insert":
+            last = first
+        elif len(args) > 2:
+            last = min(self._line(args[2]), count)
+        else:
+            # one character, which joins two lines if it is a newline
+            last = min(self._line(f"{args[1]}+1c"), count)
+        result = self._call(*args)
+        old_count = last - first + 1
+        self.on_edit(first - 1, old_count, old_count + self._line("end-1c") - count)
+        return result
+
+
+class LivePreview:
+    """Keeps ``output_text`` in step with ``input_text`` as the user types.
+
+    Edits reported by ``TextEditHook`` are merged into one dirty range and
+    applied on the input's ``<<Modified>>`` event. ``get_options`` returns
+    the current line-pass options; tokenize comment mode is not local, so
+    it falls back to re-cleaning everything on each edit. Both widgets are
+    hooked so that ``swap`` can exchange their roles.
+    """
+
+    def __init__(self, input_text, output_text, get_options):
+        self.input_text = input_text
+        self.output_text = output_text
+        self.get_options = get_options
+        self.enabled = False
+        self.model = None
+        self.pending = None
+        self.hooks = []
+        for widget in (input_text, output_text):
+            self.hooks.append(TextEditHook(
+                widget, lambda *edit, widget=widget: self._record(widget, *edit)))
+            widget.bind("<<Modified>>", self._on_modified, add="+")
+
+    def swap(self):
+        self.input_text, self.output_text = self.output_text, self.input_text
+        self.resync()
+
+    def enable(self):
+        self.enabled = True
+        self.resync()
+
+    def disable(self):
+        self.enabled = False
+        self.model = None
+        self.pending = None
+
+    def resync(self):
+        if not self.enabled:
+            return
+        options = dict(self.get_options())
+        self.pending = None
+        text = self.input_text.get("1.0", "end-1c")
+        if options.pop("comment_mode", "line") == "tokenize" and options.get("remove_comments"):
+            self.model = None
+            out = list(clean_lines(text.split("\n"), comment_mode="tokenize",
+                                   **options))
+        else:
+            self.model = LiveCleaner(**options)
+            out = self.model.reset(text.split("\n"))
+        self.output_text.delete("1.0", "end")
+        self.output_text.insert("1.0", "".join(line + "\n" for line in out))
+
+    def _record(self, widget, start, old_count=0, new_count=0):
+        if not self.enabled or widget is not self.input_text:
+            return
+        if start == FULL or self.pending == FULL:
+            self.pending = FULL
+            return
+        if self.pending is None:
+            self.pending = (start, old_count, new_count)
+            return
+        p_start, p_old, p_new = self.pending
+        u0 = min(p_start, start)
+        u1 = max(p_start + p_new, start + old_count)
+        self.pending = (u0, p_old + (u1 - u0 - p_new),
+                        u1 - u0 + new_count - old_count)
+
+    def _on_modified(self, event):
+        if not event.widget.edit_modified():
+            return
+        event.widget.edit_modified(False)
+        if event.widget is not self.input_text:
+            return
+        if not self.enabled or self.pending is None:
+            return
+        if self.pending == FULL or self.model is None:
+            self.resync()
+            return
+        start, old_count, new_count = self.pending
+        self.pending = None
+        text = self.input_text.get(f"{start + 1}.0", f"{start + new_count}.end")
+        out_start, out_old, out_new = self.model.update(
+            start, old_count, text.split("\n"))
+        self.output_text.delete(f"{out_start + 1}.0", f"{out_start + out_old + 1}.0")
+        if out_new:
+            self.output_text.insert(f"{out_start + 1}.0",
+                                    "".join(line + "\n" for line in out_new))
@@ -0,0 +1,104 @@
+import cProfile
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+log = logging.getLogger("code_cleaner")
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+
+def setup_logging(default="INFO"):
+    """Log to stderr at ``$CODE_CLEANER_LOG_LEVEL``, else ``default``."""
+    logging.basicConfig(
+        level=os.environ.get("CODE_CLEANER_LOG_LEVEL", default).upper(),
+        format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+
+def pass_record(name, start, text_in, text_out, lines_in=None, lines_out=None):
+    """Return a timing record for one pass that ran from ``start`` until now.
+
+    ``lines_*`` default to counting newlines, which is only done when the
+    caller does not already know them.
+    """
+    return {
+        "pass": name,
+        "seconds": time.perf_counter() - start,
+        "lines_in": text_in.count("\n") if lines_in is None else lines_in,
+        "lines_out": text_out.count("\n") if lines_out is None else lines_out,
+        "chars_in": len(text_in),
+        "chars_out": len(text_out),
+    }
+
+
+def summarize(timings):
+    """``"clean 12 ms, autopep8 340 ms"`` for the status bar."""
+    return ", ".join(f"{t['pass']} {t['seconds'] * 1000:.0f} ms" for t in timings)
+
+
+def merge(totals, timings):
+    """Add ``timings`` into ``totals`` (pass name -> summed record)."""
+    for t in timings:
+        total = totals.setdefault(t["pass"], dict.fromkeys(t, 0))
+        for key, value in t.items():
+            if key != "pass":
+                total[key] += value
+        total["pass"] = t["pass"]
+    return totals
+
+
+def log_timings(event, timings, **fields):
+    """Emit one structured (JSON) log line for a finished run."""
+    if log.isEnabledFor(logging.INFO):
+        log.info(json.dumps(dict(fields, event=event, passes=timings,
+                                 seconds=sum(t["seconds"] for t in timings))))
+
+
+def profile_path(mode, directory):
+    """Where the last run's profile goes by default."""
+    name = "last_run.prof" if mode == "cprofile" else "last_run_tracemalloc.txt"
+    return os.path.join(directory, name)
+
+
+@contextmanager
+def capture(mode, path):
+    """Profile the body with ``cProfile`` or ``tracemalloc`` into ``path``.
+
+    cProfile writes a ``pstats`` file; tracemalloc writes the top
+    allocation sites as text. ``mode=None`` does nothing.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"unknown profile mode {mode!r}")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+        return
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(25)
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started:
+            tracemalloc.stop()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n")
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+    log.info("profile written to %s", path)
@@ -0,0 +1,432 @@
+import re
+import time
+import tokenize
+from collections import deque
+from itertools import chain, compress, filterfalse, islice
+from operator import or_
+
+from cleaner_format import HAS_AUTOPEP8, HAS_ISORT, get_formatter
+from cleaner_profile import pass_record
+
+LINE = "line"
+TOKEN = "token"
+FILE = "file"
+
+COMMENT_RE = re.compile(r'^\s*#')
+CODING_RE = re.compile(r'^[ \t\f]*#.*?coding[:=][ \t]*[-\w.]+')
+# lines per block when the input comes one line at a time
+BLOCK_LINES = 10000
+
+RULES = {}
+# rules with no option of their own in clean_source; enabled by name
+EXTRA_RULES = ("strip_bom", "tabs_to_spaces")
+
+
+def register(cls):
+    """Class decorator adding a rule to ``RULES`` under its ``name``."""
+    RULES[cls.name] = cls
+    return cls
+
+
+class Rule:
+    """One cleaning step.
+
+    ``kind`` says how much of the file the rule needs to see:
+
+    ``LINE``
+        Looks at one line at a time (plus its own state). ``block_step``
+        returns a fresh callable taking a list of lines and returning the
+        cleaned list, so the common rules can use list-wide builtins.
+        Simpler rules define ``line_step`` instead: a fresh callable taking
+        a line and returning it rewritten, or None to drop it.
+        Neighbouring line rules run block by block in a single pass.
+    ``TOKEN``
+        Needs the tokenizer, so runs as its own generator. ``stream``
+        yields exactly one item per input line, None for a dropped one.
+    ``FILE``
+        Sees the whole cleaned text via ``apply``; formatters. When only
+        some lines were cleaned, ``line_ranges`` lists them (1-based,
+        inclusive) and a rule that can should keep to those.
+
+    Rules run in ``order``; ``counter`` names the stats key incremented
+    for every line the rule drops.
+    """
+
+    name = None
+    kind = LINE
+    order = 50
+    counter = None
+
+    @property
+    def available(self):
+        return True
+
+    def line_step(self):
+        raise NotImplementedError
+
+    def block_step(self):
+        step = self.line_step()
+
+        def run(block):
+            return [line for line in map(step, block) if line is not None]
+        return run
+
+    def stream(self, lines, counts):
+        raise NotImplementedError
+
+    def apply(self, text, line_ranges=None):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<rule {self.name}>"
+
+
+@register
+class StripBom(Rule):
+    name = "strip_bom"
+    order = 0
+
+    def line_step(self):
+        first = True
+
+        def step(line):
+            nonlocal first
+            if first:
+                first = False
+                return line.lstrip("\ufeff")
+            return line
+        return step
+
+
+@register
+class TabsToSpaces(Rule):
+    """Expands tabs in indentation only; tabs inside code are kept."""
+
+    name = "tabs_to_spaces"
+    order = 5
+
+    def __init__(self, tabsize=4):
+        self.tabsize = tabsize
+
+    def line_step(self):
+        tabsize = self.tabsize
+
+        def step(line):
+            if "\t" in line:
+                code = line.lstrip(" \t")
+                return line[:len(line) - len(code)].expandtabs(tabsize) + code
+            return line
+        return step
+
+
+@register
+class TrimTrailing(Rule):
+    name = "trim"
+    order = 10
+
+    def block_step(self):
+        def run(block):
+            return list(map(str.rstrip, block))
+        return run
+
+
+@register
+class LineComments(Rule):
+    name = "comments"
+    order = 20
+    counter = "comments_removed"
+
+    def block_step(self):
+        match = COMMENT_RE.match
+
+        def run(block):
+            return list(filterfalse(match, block))
+        return run
+
+
+@register
+class TokenComments(Rule):
+    name = "comments_tokenize"
+    kind = TOKEN
+    order = 20
+    counter = "comments_removed"
+
+    def stream(self, lines, counts):
+        counter = {}
+        try:
+            yield from strip_comments(lines, counter)
+        finally:
+            counts[self.counter] = counts.get(self.counter, 0) + \
+                counter.get("inline", 0)
+
+
+@register
+class CollapseBlank(Rule):
+    name = "collapse"
+    order = 30
+
+    def block_step(self):
+        # a blank line is dropped when the line before it was blank too
+        after_text = True
+
+        def run(block):
+            nonlocal after_text
+            if not block:
+                return block
+            text = list(map(bool, map(str.strip, block)))
+            keep = map(or_, text, chain((after_text,), text))
+            after_text = text[-1]
+            return list(compress(block, keep))
+        return run
+
+
+@register
+class Autopep8(Rule):
+    name = "autopep8"
+    kind = FILE
+    order = 100
+
+    @property
+    def available(self):
+        return HAS_AUTOPEP8
+
+    def apply(self, text, line_ranges=None):
+        if line_ranges is None:
+            return get_formatter().autopep8(text)
+        # bottom-up, so fixes that add or remove lines keep the rest valid
+        for line_range in sorted(line_ranges, reverse=True):
+            text = get_formatter().autopep8(text, line_range)
+        return text
+
+
+@register
+class Isort(Rule):
+    name = "isort"
+    kind = FILE
+    order = 110
+
+    @property
+    def available(self):
+        return HAS_ISORT
+
+    def apply(self, text, line_ranges=None):
+        return get_formatter().isort(text)
+
+
+def _is_protected_comment(row, line):
+    if row == 1 and line.startswith("#!"):
+        return True
+    return row <= 2 and CODING_RE.match(line) is not None
+
+
+def strip_comments(lines, counter=None):
+    """Remove full-line and inline comments using ``tokenize``.
+
+    Yields exactly one item per input line: the line with any trailing
+    comment cut off, or None where the whole line was a comment. ``#``
+    inside strings is never touched, and the shebang and encoding cookie
+    are kept. A comment line after a backslash continuation becomes an
+    empty line instead, since dropping it would join the continuation to
+    the next statement. If the source stops tokenizing, the remaining
+    lines are passed through unchanged. Comments cut from lines that are
+    kept are added to ``counter["inline"]``.
+    """
+    source = iter(lines)
+    pending = deque()
+    cuts = {}
+    next_row = 1
+    read_rows = 0
+    continued = False
+
+    def readline():
+        nonlocal read_rows
+        line = next(source, None)
+        if line is None:
+            return ""
+        read_rows += 1
+        pending.append(line)
+        return line + "\n"
+
+    def flush(upto):
+        nonlocal next_row, continued
+        while pending and next_row < upto:
+            line = pending.popleft()
+            col = cuts.pop(next_row, None)
+            if col is None or _is_protected_comment(next_row, line):
+                out = line
+                continued = line.endswith("\\")
+            elif line[:col].strip() == "" and not continued:
+                out = None
+            else:
+                if counter is not None:
+                    counter["inline"] = counter.get("inline", 0) + 1
+                out = line[:col].rstrip()
+                continued = False
+            next_row += 1
+            yield out
+
+    try:
+        for tok in tokenize.generate_tokens(readline):
+            yield from flush(tok.start[0])
+            if tok.type == tokenize.COMMENT:
+                cuts[tok.start[0]] = tok.start[1]
+    except (tokenize.TokenError, SyntaxError):
+        pass
+    yield from flush(read_rows + 1)
+    yield from source
+
+
+def _blocks(lines, size=BLOCK_LINES):
+    """Group an iterable of lines into lists of up to ``size`` lines."""
+    lines = iter(lines)
+    while True:
+        block = list(islice(lines, size))
+        if not block:
+            return
+        yield block
+
+
+def _line_pass(rules, count_in, count_out, skip_none, none_counter):
+    """Return one generator function running every rule in ``rules``.
+
+    It takes and yields blocks (lists) of lines. ``skip_none`` drops the
+    None placeholders a ``TOKEN`` stage before the pass yields, counting
+    them under ``none_counter``. Each call of the result starts from
+    fresh rule state.
+    """
+    def run(blocks, progress, counts):
+        steps = [(rule.block_step(), rule.counter) for rule in rules]
+        report = progress if count_in else None
+        dropped = {}
+        lines_in = lines_out = 0
+        try:
+            for block in blocks:
+                lines_in += len(block)
+                if report is not None:
+                    report("clean", lines_in)
+                if skip_none:
+                    size = len(block)
+                    block = [line for line in block if line is not None]
+                    if none_counter:
+                        dropped[none_counter] = dropped.get(none_counter, 0) + \
+                            size - len(block)
+                for step, counter in steps:
+                    size = len(block)
+                    block = step(block)
+                    if counter:
+                        dropped[counter] = dropped.get(counter, 0) + \
+                            size - len(block)
+                lines_out += len(block)
+                if block:
+                    yield block
+        finally:
+            if count_in:
+                counts["lines_in"] += lines_in
+            if count_out:
+                counts["lines_out"] += lines_out
+            for key, n in dropped.items():
+                counts[key] = counts.get(key, 0) + n
+    return run
+
+
+class Pipeline:
+    """Rules compiled into the fewest traversals of the text.
+
+    Consecutive ``LINE`` rules share one pass over blocks of lines, each
+    ``TOKEN`` rule is a generator between such passes, and ``FILE`` rules
+    run on the joined result. Line counts and every rule ``counter`` are
+    collected into the ``stats`` dict of each run.
+    """
+
+    def __init__(self, rules):
+        self.rules = sorted((r for r in rules if r.available),
+                            key=lambda r: r.order)
+        self.file_rules = [r for r in self.rules if r.kind == FILE]
+        # (rules, skip_none, none_counter) for a pass, a Rule for a TOKEN stage
+        stages = []
+        group = []
+        after_token = False
+        none_counter = None
+        for rule in self.rules:
+            if rule.kind == LINE:
+                group.append(rule)
+            elif rule.kind == TOKEN:
+                if group or after_token:
+                    stages.append((group, after_token, none_counter))
+                stages.append(rule)
+                group = []
+                after_token = True
+                none_counter = rule.counter
+        stages.append((group, after_token, none_counter))
+
+        loops = [i for i, stage in enumerate(stages) if not isinstance(stage, Rule)]
+        self._stages = []
+        for i, stage in enumerate(stages):
+            if isinstance(stage, Rule):
+                self._stages.append(stage)
+            else:
+                group, skip_none, none_counter = stage
+                self._stages.append(_line_pass(
+                    group, count_in=i == loops[0], count_out=i == loops[-1],
+                    skip_none=skip_none, none_counter=none_counter))
+
+    @property
+    def names(self):
+        return [rule.name for rule in self.rules]
+
+    def blocks(self, blocks, stats=None, progress=None):
+        """Run the line and token rules over ``blocks``, lists of lines.
+
+        Yields the output in blocks. ``stats`` gets ``lines_in``,
+        ``lines_out`` and every rule counter. ``progress`` is called as
+        ``progress("clean", lines_read)`` after every input block.
+        """
+        counts = {} if stats is None else stats
+        counts.update(lines_in=0, lines_out=0, comments_removed=0)
+        for stage in self._stages:
+            if isinstance(stage, Rule):
+                blocks = _blocks(stage.stream(chain.from_iterable(blocks),
+                                              counts))
+            else:
+                blocks = stage(blocks, progress, counts)
+        return blocks
+
+    def lines(self, lines, stats=None, progress=None):
+        """``blocks`` for an iterable of lines; yields output lines."""
+        return chain.from_iterable(self.blocks(_blocks(lines), stats, progress))
+
+    def format(self, text, progress=None, timings=None, line_ranges=None):
+        """Run the ``FILE`` rules over ``text``."""
+        for rule in self.file_rules:
+            if progress is not None:
+                progress(rule.name, 0)
+            start = time.perf_counter()
+            result = rule.apply(text, line_ranges)
+            if timings is not None:
+                timings.append(pass_record(rule.name, start, text, result))
+            text = result
+        return text
+
+
+def rules_for(remove_comments=False, trim_trailing=True, collapse_blank=True,
+              comment_mode="line", use_autopep8=False, sort_imports=False,
+              rules=()):
+    """Return the rule instances for the classic options plus ``rules``.
+
+    ``rules`` holds extra rule names from ``RULES`` or rule instances.
+    """
+    selected = []
+    if trim_trailing:
+        selected.append(TrimTrailing())
+    if remove_comments:
+        selected.append(TokenComments() if comment_mode == "tokenize"
+                        else LineComments())
+    if collapse_blank:
+        selected.append(CollapseBlank())
+    if use_autopep8:
+        selected.append(Autopep8())
+    if sort_imports:
+        selected.append(Isort())
+    for rule in rules:
+        selected.append(RULES[rule]() if isinstance(rule, str) else rule)
+    return selected
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from cleaner_cache import clean_job
+from cleaner_format import warm_up
+from cleaner_rules import EXTRA_RULES
+
+# request keys other than "id" and "code"; same names as CleanRequest
+OPTION_TYPES = {
+    "remove_comments": bool,
+    "comment_mode": str,
+    "trim_trailing": bool,
+    "collapse_blank": bool,
+    "use_autopep8": bool,
+    "sort_imports": bool,
+    "rules": list,
+    "verify": bool,
+}
+COMMENT_MODES = ("line", "tokenize")
+# requests read ahead per worker before reading stdin blocks
+PENDING_PER_WORKER = 4
+
+
+class RequestError(ValueError):
+    def __init__(self, message, request_id=None):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+def parse_request(line):
+    """Return ``(id, code, options)`` for one request line.
+
+    Raises ``RequestError`` (carrying the id, if there was one) for
+    anything malformed.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        raise RequestError(f"invalid JSON: {e}") from None
+    if not isinstance(request, dict):
+        raise RequestError("request must be a JSON object")
+    request_id = request.pop("id", None)
+    code = request.pop("code", None)
+    if not isinstance(code, str):
+        raise RequestError('"code" must be a string', request_id)
+    for key, value in request.items():
+        expected = OPTION_TYPES.get(key)
+        if expected is None:
+            raise RequestError(f"unknown option {key!r}", request_id)
+        if not isinstance(value, expected):
+            raise RequestError(f"{key!r} must be a {expected.__name__}",
+                               request_id)
+    if request.get("comment_mode", "line") not in COMMENT_MODES:
+        raise RequestError(f"'comment_mode' must be one of {COMMENT_MODES}",
+                           request_id)
+    for rule in request.get("rules", ()):
+        if rule not in EXTRA_RULES:
+            raise RequestError(f"unknown rule {rule!r}", request_id)
+    return request_id, code, request
+
+
+class StdioServer:
+    """Cleans NDJSON requests from ``stdin``, answering on ``stdout``.
+
+    Each line is a JSON object with the source in ``"code"``, any of the
+    ``OPTION_TYPES`` options and an optional ``"id"`` that is echoed
+    back. Requests run concurrently on a warm process pool, so replies
+    come in completion order, one line each: ``{"id", "status": "ok",
+    "cleaned_code", "stats", "timings"}`` or ``{"id", "status": "error",
+    "error"}``. The server exits once stdin closes and every reply has
+    been written.
+    """
+
+    def __init__(self, stdin=None, stdout=None, jobs=None, cache=None):
+        self.stdin = stdin if stdin is not None else sys.stdin.buffer
+        self.stdout = stdout if stdout is not None else sys.stdout.buffer
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.jobs * PENDING_PER_WORKER)
+
+    def reply(self, message):
+        data = json.dumps(message).encode("ascii") + b"\n"
+        with self._lock:
+            self.stdout.write(data)
+            self.stdout.flush()
+
+    def _done(self, request_id, future):
+        self._slots.release()
+        try:
+            result = future.result()
+        except Exception as e:
+            self.reply({"id": request_id, "status": "error", "error": str(e)})
+        else:
+            self.reply({"id": request_id, "status": "ok", **result})
+
+    def serve(self):
+        with ProcessPoolExecutor(max_workers=self.jobs,
+                                 initializer=warm_up) as pool:
+            for line in self.stdin:
+                if not line.strip():
+                    continue
+                try:
+                    request_id, code, options = parse_request(line)
+                except RequestError as e:
+                    self.reply({"id": e.request_id, "status": "error",
+                                "error": str(e)})
+                    continue
+                self._slots.acquire()
+                future = pool.submit(clean_job, code, self.cache, options)
+                future.add_done_callback(partial(self._done, request_id))
@@ -0,0 +1,76 @@
+import ast
+import hashlib
+import sys
+import time
+
+from cleaner_profile import pass_record
+
+AST_VERSION = "1;python={}.{}".format(*sys.version_info[:2])
+
+
+class VerificationError(Exception):
+    """Cleaning changed what the code means, or broke it."""
+
+
+def _key(source):
+    h = hashlib.sha256()
+    h.update(f"ast;{AST_VERSION}".encode("utf-8"))
+    h.update(b"\0")
+    h.update(source.encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def ast_digest(source, cache=None):
+    """Hash of ``source``'s AST without positions; None if it does not parse.
+
+    Comments and layout are not part of the AST, so two sources get the
+    same digest exactly when Python reads them as the same program. The
+    result is kept in ``cache`` (a ``ResultCache``) by content hash.
+    """
+    key = _key(source) if cache is not None else None
+    if key is not None:
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["digest"]
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        digest = None
+    else:
+        digest = hashlib.sha256(ast.dump(tree).encode("utf-8")).hexdigest()
+    if key is not None:
+        cache.put(key, {"digest": digest})
+    return digest
+
+
+def verify(original, cleaned, cache=None, timings=None):
+    """Check that ``cleaned`` is the same program as ``original``.
+
+    Raises ``VerificationError`` if it no longer parses or its AST differs.
+    Returns False when ``original`` does not parse either, so there was
+    nothing to check, and True otherwise.
+    """
+    start = time.perf_counter()
+    try:
+        if cleaned == original:
+            return True
+        before = ast_digest(original, cache)
+        if before is None:
+            return False
+        after = ast_digest(cleaned, cache)
+        if after is None:
+            try:
+                ast.parse(cleaned)
+            except SyntaxError as e:
+                raise VerificationError(f"cleaned code does not parse: "
+                                        f"{e.msg} (line {e.lineno})") from None
+            except ValueError as e:
+                raise VerificationError(
+                    f"cleaned code does not parse: {e}") from None
+        if after != before:
+            raise VerificationError(
+                "cleaned code parses to a different AST than the original")
+        return True
+    finally:
+        if timings is not None:
+            timings.append(pass_record("verify", start, original, cleaned))
@@ -0,0 +1,235 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from cleaner_batch import clean_file, iter_python_files, skip_dir
+from cleaner_format import warm_up
+
+# quiet time after the last event before a file is cleaned
+DEBOUNCE = 0.2
+POLL_INTERVAL = 1.0
+IDLE_TIMEOUT = 1.0
+RESULT_POLL = 0.05
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+              | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class InotifyWatcher:
+    """Reports saved ``*.py`` files under ``paths`` using Linux inotify.
+
+    Directories are watched recursively, skipping what
+    ``iter_python_files`` skips, and new ones are picked up as they
+    appear. A file in ``paths`` is watched through its directory. Raises
+    ``OSError`` where inotify is unavailable.
+    """
+
+    def __init__(self, paths):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify is not available: {e}") from e
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self.paths = list(paths)
+        self._dirs = {}
+        self._recursive = set()
+        self._files = set()
+        try:
+            for path in self.paths:
+                if os.path.isdir(path):
+                    self._add_tree(path)
+                else:
+                    self._files.add(os.path.normpath(path))
+                    self._add_dir(os.path.dirname(path) or ".", False)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_dir(self, path, recursive):
+        wd = self._add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"cannot watch {path}: {os.strerror(err)}")
+        self._dirs[wd] = path
+        if recursive:
+            self._recursive.add(wd)
+
+    def _add_tree(self, root):
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not skip_dir(d)]
+            self._add_dir(dirpath, True)
+
+    def _wanted(self, wd, path):
+        if not path.endswith(".py"):
+            return False
+        return wd in self._recursive or os.path.normpath(path) in self._files
+
+    def fileno(self):
+        return self._fd
+
+    def changes(self, timeout=None):
+        """Paths written since the last call; waits up to ``timeout``."""
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, size = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                name = os.fsdecode(data[offset:offset + size].rstrip(b"\0"))
+                offset += size
+                if mask & IN_Q_OVERFLOW:
+                    # events were lost; let the caller's stamps sort it out
+                    changed.update(iter_python_files(self.paths))
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    self._recursive.discard(wd)
+                    continue
+                parent = self._dirs.get(wd)
+                if parent is None or not name:
+                    continue
+                path = os.path.join(parent, name)
+                if mask & IN_ISDIR:
+                    if wd in self._recursive and not skip_dir(name):
+                        try:
+                            self._add_tree(path)
+                        except OSError:
+                            continue
+                        # files can land before the watch does
+                        changed.update(iter_python_files([path]))
+                elif self._wanted(wd, path):
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """``InotifyWatcher`` fallback comparing mtimes every ``interval`` seconds."""
+
+    def __init__(self, paths, interval=POLL_INTERVAL):
+        self.paths = list(paths)
+        self.interval = interval
+        self._stamps = self._scan()
+        self._next = time.monotonic() + interval
+
+    def _scan(self):
+        stamps = {}
+        for path in iter_python_files(self.paths):
+            stamp = _stamp(path)
+            if stamp is not None:
+                stamps[path] = stamp
+        return stamps
+
+    def changes(self, timeout=None):
+        wait = self._next - time.monotonic()
+        if timeout is not None and timeout < wait:
+            time.sleep(max(timeout, 0))
+            return set()
+        time.sleep(max(wait, 0))
+        stamps = self._scan()
+        self._next = time.monotonic() + self.interval
+        changed = {path for path, stamp in stamps.items()
+                   if self._stamps.get(path) != stamp}
+        self._stamps = stamps
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(paths, polling=False):
+    """An ``InotifyWatcher`` if possible, else a ``PollingWatcher``."""
+    if not polling:
+        try:
+            return InotifyWatcher(paths)
+        except OSError:
+            pass
+    return PollingWatcher(paths)
+
+
+def watch(paths, options, write=True, diff=False, jobs=None, cache=None,
+          debounce=DEBOUNCE, polling=False, on_result=None, stop=None):
+    """Clean the Python files under ``paths`` whenever they are saved.
+
+    Runs until ``stop`` (a ``threading.Event``) is set or the caller is
+    interrupted. Events for a file are coalesced until it has been quiet
+    for ``debounce`` seconds, then it is handed to a process pool whose
+    formatters stay loaded between events. Files whose mtime and size did
+    not change since they were last cleaned are skipped, so our own
+    rewrites do not trigger another round. ``on_result`` gets every
+    ``clean_file`` result.
+    """
+    watcher = open_watcher(paths, polling)
+    worker = partial(clean_file, options=options, write=write, diff=diff,
+                     cache=cache)
+    warm = (options.get("use_autopep8", False), options.get("sort_imports", False))
+    stamps = {}
+    pending = set()
+    running = {}
+    deadline = None
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=warm_up,
+                                 initargs=warm) as pool:
+            while stop is None or not stop.is_set():
+                timeout = IDLE_TIMEOUT if deadline is None else \
+                    max(0.0, deadline - time.monotonic())
+                if running:
+                    timeout = min(timeout, RESULT_POLL)
+                changed = watcher.changes(timeout)
+                if changed:
+                    pending |= changed
+                    deadline = time.monotonic() + debounce
+                for future in [f for f in running if f.done()]:
+                    path = running.pop(future)
+                    stamps[path] = _stamp(path)
+                    if on_result is not None:
+                        on_result(future.result())
+                if not pending or time.monotonic() < deadline:
+                    continue
+                busy = set(running.values())
+                for path in pending - busy:
+                    stamp = _stamp(path)
+                    if stamp is not None and stamps.get(path) != stamp:
+                        running[pool.submit(worker, path)] = path
+                pending &= busy
+                deadline = time.monotonic() + debounce if pending else None
+    finally:
+        watcher.close()
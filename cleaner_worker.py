@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+
+from cleaner_cache import cached_clean_source
+from cleaner_diff import changed_runs
+from cleaner_encoding import sniff_file
+from cleaner_engine import clean
+from cleaner_profile import capture, log_timings, pass_record, profile_path
+
+
+class CleanCancelled(Exception):
+    pass
+
+
+class CleanWorker:
+    """Runs ``cached_clean_source`` on a background thread.
+
+    Results are never delivered by calling into Tk from the worker thread.
+    Instead ``(job_id, kind, value)`` tuples are put on ``events`` and the
+    UI drains them with ``poll`` from a ``root.after`` loop. ``kind`` is one
+    of ``"progress"``, ``"done"``, ``"cancelled"`` or ``"error"``. Submitting
+    a new job cancels the running one; events from stale jobs are dropped.
+
+    The ``"done"`` stats carry a ``"timings"`` list of per-pass records,
+    and with ``submit(..., changes=True)`` a ``"changes"`` list from
+    ``changed_runs``, so the UI only has to apply the tags.
+    Setting ``profile`` to ``"cprofile"`` or ``"tracemalloc"`` dumps a
+    profile of every job to ``profile_path`` (the last run wins).
+    """
+
+    def __init__(self, cache=None, profile=None, profile_path=None):
+        self.cache = cache
+        self.profile = profile
+        self.profile_path = profile_path
+        self.events = queue.Queue()
+        self.job_id = 0
+        self._cancel = None
+
+    @property
+    def busy(self):
+        return self._cancel is not None
+
+    def submit(self, source, changes=False, **options):
+        def work(progress, stats, timings):
+            cleaned = cached_clean_source(source, cache=self.cache,
+                                          stats=stats, progress=progress,
+                                          timings=timings, **options)
+            if changes:
+                progress("diff", 0)
+                stats["changes"] = changed_runs(source, cleaned)
+            return cleaned
+        return self._start(work, source.count("\n") + 1)
+
+    def submit_file(self, in_path, out_path, **options):
+        """Stream-clean ``in_path`` into ``out_path``; formatters are skipped.
+
+        ``out_path`` gets the encoding and newline style of ``in_path``.
+        """
+        def work(progress, stats, timings):
+            start = time.perf_counter()
+            fmt = sniff_file(in_path)
+            with open(in_path, "r", encoding=fmt.encoding) as f_in, \
+                    open(out_path, "w", encoding=fmt.encoding,
+                         newline=fmt.newline) as f_out:
+                clean(f_in, out=f_out, stats=stats, progress=progress,
+                      **options)
+            timings.append(pass_record("clean", start, "", "",
+                                       stats["lines_in"], stats["lines_out"]))
+            return out_path
+        return self._start(work, None)
+
+    def _start(self, work, total):
+        self.cancel()
+        self.job_id += 1
+        self._cancel = threading.Event()
+        thread = threading.Thread(
+            target=self._run, args=(self.job_id, self._cancel, work, total),
+            daemon=True)
+        thread.start()
+        return self.job_id
+
+    def cancel(self):
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+
+    def poll(self):
+        """Return the pending events of the current job, oldest first."""
+        events = []
+        while True:
+            try:
+                job_id, kind, value = self.events.get_nowait()
+            except queue.Empty:
+                return events
+            if job_id != self.job_id:
+                continue
+            if kind != "progress":
+                self._cancel = None
+            events.append((kind, value))
+
+    def _run(self, job_id, cancel, work, total):
+        def progress(stage, done):
+            if cancel.is_set():
+                raise CleanCancelled()
+            if stage != "clean":
+                self.events.put((job_id, "progress", f"running {stage}"))
+            elif total:
+                self.events.put((job_id, "progress", f"{min(done * 100 // total, 99)}%"))
+            else:
+                self.events.put((job_id, "progress", f"{done:,} lines"))
+
+        stats = {}
+        timings = []
+        path = self.profile_path
+        if self.profile is not None and path is None:
+            path = profile_path(self.profile, self.cache.directory
+                                if self.cache is not None else ".")
+        try:
+            with capture(self.profile, path):
+                result = work(progress, stats, timings)
+        except CleanCancelled:
+            self.events.put((job_id, "cancelled", None))
+            return
+        except Exception as e:
+            self.events.put((job_id, "error", e))
+            return
+        if cancel.is_set():
+            self.events.put((job_id, "cancelled", None))
+        else:
+            stats["timings"] = timings
+            log_timings("clean", timings, job=job_id,
+                        lines_in=stats.get("lines_in"),
+                        lines_out=stats.get("lines_out"))
+            self.events.put((job_id, "done", (result, stats)))
@@ -1,17 +1,45 @@
-import re
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
 import tkinter as tk
+from functools import partial
 from tkinter import filedialog, messagebox, ttk
 
-try:
-    import autopep8
-    HAS_AUTOPEP8 = True
-except Exception:
-    HAS_AUTOPEP8 = False
+from cleaner_batch import iter_python_files, run_batch
+from cleaner_cache import ResultCache
+from cleaner_diff import PatchWriter, highlight_changes
+from cleaner_document import (PAGED_THRESHOLD, PagedFile, PagedView,
+                              insert_chunked, swap_slots, write_chunked)
+from cleaner_encoding import (DEFAULT_FORMAT, decode, output_format,
+                              sniff_file)
+from cleaner_format import HAS_AUTOPEP8
+from cleaner_git import GitError, changed_lines
+from cleaner_live import LivePreview
+from cleaner_profile import (PROFILE_MODES, capture, log_timings, merge,
+                             profile_path, setup_logging, summarize)
+from cleaner_rules import EXTRA_RULES
+from cleaner_stdio import StdioServer
+from cleaner_watch import watch
+from cleaner_worker import CleanWorker
+
+POLL_MS = 50
 
 
 class CodeCleanerApp:
-    def __init__(self, root):
+    def __init__(self, root, paged_threshold=PAGED_THRESHOLD):
         self.root = root
+        self.cache = ResultCache()
+        self.worker = CleanWorker(self.cache,
+                                  profile=os.environ.get("CODE_CLEANER_PROFILE"))
+        self._polling = False
+        self.paged_threshold = paged_threshold
+        self.views = {}
+        self._temp_paths = set()
+        self._clean_to_file = None
+        self.source_format = DEFAULT_FORMAT
         root.title("Code Cleaner")
         root.geometry("900x700")
 
@@ -31,6 +59,10 @@ class CodeCleanerApp:
         ttk.Checkbutton(top_frame, text="Remove full-line comments (#...)",
                         variable=self.remove_comments_var).pack(side=tk.LEFT, padx=6)
 
+        self.inline_comments_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Inline comments too (tokenize)",
+                        variable=self.inline_comments_var).pack(side=tk.LEFT, padx=6)
+
         self.trim_trailing_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(top_frame, text="Trim trailing whitespace",
                         variable=self.trim_trailing_var).pack(side=tk.LEFT, padx=6)
@@ -47,6 +79,16 @@ class CodeCleanerApp:
             ttk.Label(top_frame, text="(autopep8 not installed)").pack(
                 side=tk.LEFT, padx=6)
 
+        self.show_changes_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Highlight changes",
+                        variable=self.show_changes_var).pack(side=tk.LEFT, padx=6)
+
+        self.live_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Live preview", variable=self.live_var,
+                        command=self.toggle_live).pack(side=tk.LEFT, padx=6)
+
+        ttk.Button(top_frame, text="Cancel",
+                   command=self.cancel_clean).pack(side=tk.RIGHT, padx=6)
         ttk.Button(top_frame, text="Clean Code ▶",
                    command=self.clean_code).pack(side=tk.RIGHT, padx=6)
         ttk.Button(top_frame, text="Swap Input/Output",
@@ -56,16 +98,20 @@ class CodeCleanerApp:
         paned.pack(fill=tk.BOTH, expand=True)
 
         input_frame = ttk.Labelframe(paned, text="Input Code", padding=(6, 6))
-        self.input_text = tk.Text(input_frame, wrap="none", undo=True)
-        self._add_scrollbars(input_frame, self.input_text)
+        self.input_text = tk.Text(paned, wrap="none", undo=True)
+        self.input_scroll = self._add_scrollbars(input_frame, self.input_text)
         input_frame.pack(fill=tk.BOTH, expand=True)
         paned.add(input_frame, weight=1)
 
         output_frame = ttk.Labelframe(
             paned, text="Cleaned Output", padding=(6, 6))
         self.output_text = tk.Text(
-            output_frame, wrap="none", undo=True, state=tk.NORMAL)
-        self._add_scrollbars(output_frame, self.output_text)
+            paned, wrap="none", undo=True, state=tk.NORMAL)
+        self.output_scroll = self._add_scrollbars(
+            output_frame, self.output_text)
+        for text in (self.input_text, self.output_text):
+            text.tag_configure("changed", background="#fff3b0")
+            text.tag_configure("removed", underline=True)
         output_frame.pack(fill=tk.BOTH, expand=True)
         paned.add(output_frame, weight=1)
 
@@ -74,18 +120,64 @@ class CodeCleanerApp:
                               relief=tk.SUNKEN, anchor=tk.W)
         statusbar.pack(side=tk.BOTTOM, fill=tk.X)
 
+        self.live = LivePreview(self.input_text, self.output_text,
+                                self._live_options)
+        for var in (self.remove_comments_var, self.inline_comments_var,
+                    self.trim_trailing_var, self.collapse_blank_var):
+            var.trace_add("write", lambda *args: self.live.resync())
+
+        for text in (self.input_text, self.output_text):
+            text.bind("<Control-Next>", lambda e: self._turn_page(e.widget, 1))
+            text.bind("<Control-Prior>", lambda e: self._turn_page(e.widget, -1))
+
     def _add_scrollbars(self, parent, text_widget):
-        vscroll = ttk.Scrollbar(
-            parent, orient=tk.VERTICAL, command=text_widget.yview)
-        hscroll = ttk.Scrollbar(
-            parent, orient=tk.HORIZONTAL, command=text_widget.xview)
-        text_widget.configure(yscrollcommand=vscroll.set,
-                              xscrollcommand=hscroll.set)
-        text_widget.grid(row=0, column=0, sticky="nsew")
+        vscroll = ttk.Scrollbar(parent, orient=tk.VERTICAL)
+        hscroll = ttk.Scrollbar(parent, orient=tk.HORIZONTAL)
+        self._link_scrollbars((vscroll, hscroll), text_widget)
+        text_widget.grid(row=0, column=0, sticky="nsew", in_=parent)
+        text_widget.lift()
         vscroll.grid(row=0, column=1, sticky="ns")
         hscroll.grid(row=1, column=0, sticky="ew")
         parent.rowconfigure(0, weight=1)
         parent.columnconfigure(0, weight=1)
+        return vscroll, hscroll
+
+    def _link_scrollbars(self, scrollbars, text_widget):
+        vscroll, hscroll = scrollbars
+        vscroll.configure(command=text_widget.yview)
+        hscroll.configure(command=text_widget.xview)
+        text_widget.configure(yscrollcommand=vscroll.set,
+                              xscrollcommand=hscroll.set)
+
+    def _close_view(self, widget):
+        view = self.views.pop(widget, None)
+        if view is None:
+            return
+        view.close()
+        if view.document.path in self._temp_paths:
+            self._temp_paths.discard(view.document.path)
+            os.remove(view.document.path)
+
+    def _load_path(self, widget, path):
+        """Load ``path`` into ``widget``; returns True if it is paged."""
+        self._close_view(widget)
+        widget.delete("1.0", tk.END)
+        self.source_format = sniff_file(path)
+        encoding = self.source_format.encoding
+        if os.path.getsize(path) > self.paged_threshold:
+            self.views[widget] = PagedView(widget, PagedFile(path, encoding=encoding))
+            return True
+        with open(path, "r", encoding=encoding) as f:
+            insert_chunked(widget, f)
+        return False
+
+    def _turn_page(self, widget, step):
+        view = self.views.get(widget)
+        if view is None:
+            return
+        view.show(view.number + step)
+        self.status.set(f"{os.path.basename(view.document.path)}: {view.label}")
+        return "break"
 
     def open_file(self):
         path = filedialog.askopenfilename(
@@ -93,11 +185,15 @@ class CodeCleanerApp:
         if not path:
             return
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = f.read()
-            self.input_text.delete("1.0", tk.END)
-            self.input_text.insert(tk.END, data)
-            self.status.set(f"Opened: {path}")
+            if self.live_var.get():
+                self.live_var.set(False)
+                self.live.disable()
+            if self._load_path(self.input_text, path):
+                view = self.views[self.input_text]
+                self.status.set(f"Opened read-only, {view.label} "
+                                f"(Ctrl+PgUp/PgDn): {path}")
+            else:
+                self.status.set(f"Opened: {path}")
         except Exception as e:
             messagebox.showerror("Error", f"Could not open file:\n{e}")
 
@@ -107,73 +203,394 @@ class CodeCleanerApp:
         if not path:
             return
         try:
-            data = self.output_text.get("1.0", tk.END)
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(data)
-            self.status.set(f"Saved: {path}")
+            view = self.views.get(self.output_text)
+            head = (self.output_text.get("1.0", "3.0") if view is None
+                    else view.document.page(0))
+            fmt = output_format(head, self.source_format)
+            with PatchWriter(path, fmt.encoding, fmt.newline) as f:
+                if view is not None:
+                    with open(view.document.path, "r",
+                              encoding=view.document.encoding) as src:
+                        shutil.copyfileobj(src, f)
+                else:
+                    write_chunked(self.output_text, f)
+            self.status.set(f"Saved: {path}" if f.changed
+                            else f"Unchanged: {path}")
         except Exception as e:
             messagebox.showerror("Error", f"Could not save file:\n{e}")
 
     def swap_io(self):
-        in_txt = self.input_text.get("1.0", tk.END)
-        out_txt = self.output_text.get("1.0", tk.END)
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert(tk.END, out_txt)
-        self.output_text.delete("1.0", tk.END)
-        self.output_text.insert(tk.END, in_txt)
+        swap_slots(self.input_text, self.output_text)
+        self.input_text, self.output_text = self.output_text, self.input_text
+        self._link_scrollbars(self.input_scroll, self.input_text)
+        self._link_scrollbars(self.output_scroll, self.output_text)
+        if self.input_text in self.views and self.live_var.get():
+            self.live_var.set(False)
+            self.live.disable()
+        self.live.swap()
         self.status.set("Swapped input and output")
 
+    def _live_options(self):
+        return {
+            "remove_comments": self.remove_comments_var.get(),
+            "comment_mode": "tokenize" if self.inline_comments_var.get() else "line",
+            "trim_trailing": self.trim_trailing_var.get(),
+            "collapse_blank": self.collapse_blank_var.get(),
+        }
+
+    def toggle_live(self):
+        if self.live_var.get() and self.input_text in self.views:
+            self.live_var.set(False)
+            self.status.set("Live preview is not available for paged files")
+        elif self.live_var.get():
+            self.worker.cancel()
+            self._clear_changes()
+            self.live.enable()
+            self.status.set("Live preview on")
+        else:
+            self.live.disable()
+            self.status.set("Live preview off")
+
+    def _show_changes(self, stats):
+        """Highlight what cleaning changed; returns a status bar suffix."""
+        self._clear_changes()
+        if not self.show_changes_var.get() or "changes" not in stats:
+            return ""
+        runs = highlight_changes(self.output_text, stats["changes"])
+        return f", {runs} changed hunks"
+
+    def _clear_changes(self):
+        for text in (self.input_text, self.output_text):
+            text.tag_remove("changed", "1.0", tk.END)
+            text.tag_remove("removed", "1.0", tk.END)
+
     def clean_code(self):
+        if self.live_var.get():
+            self.live_var.set(False)
+            self.live.disable()
+        view = self.views.get(self.input_text)
+        if view is not None:
+            self._start_clean_file(view.document.path)
+            return
         raw = self.input_text.get("1.0", tk.END)
-        self.status.set("Cleaning...")
-        self.root.update_idletasks()
+        options = {
+            "remove_comments": self.remove_comments_var.get(),
+            "comment_mode": "tokenize" if self.inline_comments_var.get() else "line",
+            "trim_trailing": self.trim_trailing_var.get(),
+            "collapse_blank": self.collapse_blank_var.get(),
+            "use_autopep8": bool(HAS_AUTOPEP8 and getattr(self, "use_autopep8_var", None)
+                                 and self.use_autopep8_var.get()),
+        }
+        self._start_clean(raw, options)
 
-        cleaned = raw.splitlines()
+    def _start_clean(self, raw, options, autopep8_failed=False):
+        self._discard_clean_file()
+        self._clean_raw = raw
+        self._clean_options = options
+        self._autopep8_failed = autopep8_failed
+        self.worker.submit(raw, changes=self.show_changes_var.get(),
+                           **options)
+        self._start_polling()
 
-        if self.trim_trailing_var.get():
-            cleaned = [line.rstrip() for line in cleaned]
+    def _start_clean_file(self, path):
+        self._discard_clean_file()
+        fd, out_path = tempfile.mkstemp(suffix=".py")
+        os.close(fd)
+        options = self._live_options()
+        self._clean_raw = None
+        self._clean_to_file = out_path
+        self._clean_options = dict(options, use_autopep8=False)
+        self.worker.submit_file(path, out_path, **options)
+        self._start_polling()
 
-        if self.remove_comments_var.get():
-            new_lines = []
-            for line in cleaned:
-                if re.match(r'^\s*#', line):
-                    continue
-                new_lines.append(line)
-            cleaned = new_lines
-
-        if self.collapse_blank_var.get():
-            new_lines = []
-            blank_count = 0
-            for line in cleaned:
-                if line.strip() == "":
-                    blank_count += 1
-                else:
-                    blank_count = 0
-                if blank_count <= 1:
-                    new_lines.append(line)
-            cleaned = new_lines
+    def _start_polling(self):
+        self.status.set("Cleaning...")
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll_worker)
 
-        result = "\n".join(cleaned).rstrip() + "\n"
+    def cancel_clean(self):
+        if self.worker.busy:
+            self.worker.cancel()
+            self._clean_raw = None
+            self._discard_clean_file()
+            self.status.set("Cancelled")
 
-        if HAS_AUTOPEP8 and getattr(self, "use_autopep8_var", None) and self.use_autopep8_var.get():
+    def _discard_clean_file(self):
+        if self._clean_to_file:
             try:
-                result = autopep8.fix_code(result)
-                self.status.set("Cleaned + formatted with autopep8")
-            except Exception as e:
-                self.status.set("Cleaned (autopep8 failed)")
-        else:
-            self.status.set("Cleaned")
+                os.remove(self._clean_to_file)
+            except OSError:
+                pass
+        self._clean_to_file = None
 
-        self.output_text.delete("1.0", tk.END)
-        self.output_text.insert(tk.END, result)
+    def _poll_worker(self):
+        for kind, value in self.worker.poll():
+            if kind == "progress":
+                self.status.set(f"Cleaning... {value}")
+            elif kind == "done":
+                result, stats = value
+                timing = summarize(stats["timings"])
+                self._clean_raw = None
+                if self._clean_to_file:
+                    self._clean_to_file = None
+                    if self._load_path(self.output_text, result):
+                        self._temp_paths.add(result)
+                        label = self.views[self.output_text].label
+                        self.status.set(
+                            f"Cleaned (read-only, {label}, no formatting) — {timing}")
+                    else:
+                        os.remove(result)
+                        self.status.set(f"Cleaned — {timing}")
+                    continue
+                self._close_view(self.output_text)
+                self.output_text.delete("1.0", tk.END)
+                self.output_text.insert(tk.END, result)
+                timing += self._show_changes(stats)
+                if self._autopep8_failed:
+                    self.status.set(f"Cleaned (autopep8 failed) — {timing}")
+                elif self._clean_options["use_autopep8"]:
+                    self.status.set(f"Cleaned + formatted with autopep8 — {timing}")
+                else:
+                    self.status.set(f"Cleaned — {timing}")
+            elif kind == "cancelled":
+                self._discard_clean_file()
+                self.status.set("Cancelled")
+            elif kind == "error":
+                self._discard_clean_file()
+                if self._clean_options["use_autopep8"]:
+                    options = dict(self._clean_options, use_autopep8=False)
+                    self._start_clean(self._clean_raw, options,
+                                      autopep8_failed=True)
+                else:
+                    self._clean_raw = None
+                    self.status.set(f"Cleaning failed: {value}")
+        if self.worker.busy:
+            self.root.after(POLL_MS, self._poll_worker)
+        else:
+            self._polling = False
 
 
 def main():
+    setup_logging()
     root = tk.Tk()
     app = CodeCleanerApp(root)
     root.mainloop()
 
 
+def upload_files(client, paths):
+    """Send ``paths`` to the backend in one bulk request; returns failures."""
+    def read_all():
+        for path in paths:
+            with open(path, "rb") as f:
+                yield os.path.relpath(path), decode(f.read())[0]
+    try:
+        response = client.upload_bulk(read_all())
+    except Exception as e:
+        print(f"upload error: {e}", file=sys.stderr)
+        return len(paths)
+    for item in response["files"]:
+        if item["status"] != "success":
+            print(f"upload error: {item['name']}: {item['message']}",
+                  file=sys.stderr)
+    return response["failed"]
+
+
+def _print_result(args, result):
+    path, was_changed, _, diff_text, error, _ = result
+    if error:
+        print(f"error: {path}: {error}", file=sys.stderr)
+    elif was_changed:
+        if args.diff:
+            sys.stdout.write(diff_text)
+            sys.stdout.flush()
+        elif args.check:
+            print(f"would clean: {path}", file=sys.stderr)
+        else:
+            print(f"cleaned: {path}", file=sys.stderr)
+
+
+def _watch(args, options, write, cache):
+    print(f"watching {', '.join(args.paths)} (Ctrl-C to stop)", file=sys.stderr)
+    try:
+        watch(args.paths, options, write=write, diff=args.diff,
+              jobs=args.jobs, cache=cache, polling=args.poll,
+              on_result=partial(_print_result, args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cache is not None:
+            cache.prune()
+    return 0
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="code_cleaner",
+        description="Clean every *.py file under the given paths in place.")
+    parser.add_argument("paths", nargs="*",
+                        help="files or directories (with --since/--staged: "
+                             "limit to these, default the whole repository)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--check", action="store_true",
+                      help="don't write, exit 1 if any file would change")
+    mode.add_argument("--diff", action="store_true",
+                      help="don't write, print a unified diff instead")
+    parser.add_argument("--remove-comments", action="store_true",
+                        help="remove full-line comments")
+    parser.add_argument("--comment-mode", choices=("line", "tokenize"),
+                        default="line",
+                        help="'tokenize' also removes inline comments and "
+                             "never touches strings")
+    parser.add_argument("--no-trim", action="store_true",
+                        help="keep trailing whitespace")
+    parser.add_argument("--no-collapse", action="store_true",
+                        help="keep runs of blank lines")
+    parser.add_argument("--autopep8", action="store_true",
+                        help="format with autopep8")
+    parser.add_argument("--isort", action="store_true",
+                        help="sort imports with isort")
+    parser.add_argument("--rule", action="append", choices=EXTRA_RULES,
+                        default=[], help="also run this rule (repeatable)")
+    parser.add_argument("--verify", action="store_true",
+                        help="refuse any result that does not parse to the "
+                             "same AST as the original")
+    parser.add_argument("--since", metavar="REF", default=None,
+                        help="only clean lines changed in the git working "
+                             "tree since REF, plus untracked files")
+    parser.add_argument("--staged", action="store_true",
+                        help="only clean lines staged for commit "
+                             "(against --since, default HEAD)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and clean files as they are saved")
+    parser.add_argument("--poll", action="store_true",
+                        help="with --watch, poll for changes instead of "
+                             "using inotify")
+    parser.add_argument("--stdio", action="store_true",
+                        help="serve NDJSON cleaning requests on stdin/stdout "
+                             "until stdin closes")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="result cache location")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always run the full pipeline")
+    parser.add_argument("--upload", metavar="URL", default=None,
+                        help="send every cleaned file to the backend at URL")
+    parser.add_argument("--timings", action="store_true",
+                        help="print time spent in each pass")
+    parser.add_argument("--split-passes", action="store_true",
+                        help="run and time each line rule separately "
+                             "instead of fused")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="profile the run in one process and dump the "
+                             "result (see --profile-out)")
+    parser.add_argument("--profile-out", metavar="PATH", default=None,
+                        help="profile output (default: in the cache dir)")
+    args = parser.parse_args(argv)
+    setup_logging("WARNING")
+    if args.upload and (args.check or args.diff):
+        parser.error("--upload only works when cleaning in place")
+    incremental = args.since is not None or args.staged
+    if args.stdio:
+        if args.paths or incremental or args.watch or args.upload:
+            parser.error("--stdio takes no paths and no --since, --staged, "
+                         "--watch or --upload")
+        cache = None if args.no_cache else ResultCache(args.cache_dir)
+        StdioServer(jobs=args.jobs, cache=cache).serve()
+        return 0
+    if not args.paths and not incremental:
+        parser.error("give paths to clean, or --since/--staged")
+    if args.watch and (incremental or args.upload or args.profile):
+        parser.error("--watch cannot be combined with --since, --staged, "
+                     "--upload or --profile")
+
+    options = {
+        "remove_comments": args.remove_comments,
+        "comment_mode": args.comment_mode,
+        "trim_trailing": not args.no_trim,
+        "collapse_blank": not args.no_collapse,
+        "use_autopep8": args.autopep8,
+        "sort_imports": args.isort,
+    }
+    if args.rule:
+        options["rules"] = args.rule
+    if args.verify:
+        options["verify"] = True
+    files = iter_python_files(args.paths)
+    ranges = None
+    if incremental:
+        try:
+            ranges = changed_lines(args.since or "HEAD", args.staged, args.paths)
+        except GitError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+        files = sorted(ranges)
+    write = not (args.check or args.diff)
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+    if args.watch:
+        return _watch(args, options, write, cache)
+    jobs = 1 if args.profile else args.jobs
+    profile_out = args.profile_out
+    if args.profile and profile_out is None:
+        profile_out = profile_path(args.profile, cache.directory
+                                   if cache is not None else ".")
+    totals = {}
+    client = None
+    uploads = []
+    if args.upload:
+        from cleaner_client import BackendClient
+        client = BackendClient(args.upload)
+
+    start = time.perf_counter()
+    total = changed = errors = size = 0
+    results = run_batch(files, options, write=write, diff=args.diff,
+                        jobs=jobs, cache=cache,
+                        split_passes=args.split_passes, ranges=ranges)
+    if args.profile:
+        with capture(args.profile, profile_out):
+            results = list(results)
+    for result in results:
+        path, was_changed, nbytes, diff_text, error, timings = result
+        total += 1
+        size += nbytes
+        merge(totals, timings)
+        _print_result(args, result)
+        if error:
+            errors += 1
+        elif was_changed:
+            changed += 1
+        if client is not None and not error:
+            uploads.append(path)
+    if client is not None:
+        errors += upload_files(client, uploads)
+        client.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    if cache is not None:
+        cache.prune()
+
+    verb = "cleaned" if write else "would change"
+    print(f"{total} files, {changed} {verb}, {errors} errors in {elapsed:.2f}s "
+          f"({total / elapsed:.1f} files/s, {size / elapsed / 1e6:.2f} MB/s)",
+          file=sys.stderr)
+    timings = list(totals.values())
+    log_timings("batch", timings, files=total, changed=changed, errors=errors)
+    if args.timings:
+        for t in sorted(timings, key=lambda t: -t["seconds"]):
+            print(f"  {t['pass']:<10}{t['seconds']:>9.3f}s  "
+                  f"{t['lines_in']:>10,} -> {t['lines_out']:,} lines",
+                  file=sys.stderr)
+    if args.profile:
+        print(f"profile written to {profile_out}", file=sys.stderr)
+    if errors:
+        return 2
+    if args.check and changed:
+        return 1
+    return 0
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli())
     main()
 
@@ -1,79 +1,45 @@
 # Standard library imports
 import ast
-import re
+import os
+import shutil
+import tempfile
 from tkinter import filedialog, messagebox
 
 # Third party imports
-import requests
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 
-def send_to_backend(self):
-    cleaned_code = self.output_text.get("1.0", "end-1c")
-    if not cleaned_code.strip():
-        messagebox.showwarning("Warning", "No cleaned code to send!")
-        return
-
-    try:
-        response = requests.post(
-            "http://127.0.0.1:8000/upload_code/",
-            json={"cleaned_code": cleaned_code},
-            timeout=5
-        )
-
-        if response.status_code == 200:
-            res = response.json()
-            messagebox.showinfo("Success", f"✅ {res['message']}")
-            self.status.config(text="Cleaned code sent to backend ✅")
-        else:
-            messagebox.showerror("Error", f"Backend error: {response.text}")
-            self.status.config(text="Backend returned an error ❌")
+# Local imports
+from cleaner_batch import iter_python_files
+from cleaner_cache import ResultCache, cached_clean_source
+from cleaner_diff import PatchWriter, highlight_changes
+from cleaner_document import (PAGED_THRESHOLD, PagedFile, PagedView,
+                              insert_chunked, swap_slots, write_chunked)
+from cleaner_encoding import (DEFAULT_FORMAT, decode, output_format,
+                              sniff_file)
+from cleaner_format import HAS_AUTOPEP8, HAS_ISORT
+from cleaner_live import LivePreview
+from cleaner_profile import setup_logging, summarize
+from cleaner_worker import CleanWorker
+from cleaner_verify import VerificationError, verify
 
-    except Exception as e:
-        messagebox.showerror("Connection Error", str(e))
-        self.status.config(text="Failed to send to backend ❌")
-
-
-try:
-    import isort  
-    isort_api = getattr(isort, "api", isort)
-
-    def sort_code_with_isort(code: str) -> str:
-        try:
-            if hasattr(isort_api, "sort_code_string"):
-                return isort_api.sort_code_string(code)
-            if hasattr(isort_api, "sort_code"):
-                return isort_api.sort_code(code)
-            if hasattr(isort_api, "code"):
-                return isort_api.code(code)
-            if hasattr(isort, "sort_code_string"):
-                return isort.sort_code_string(code)
-            if hasattr(isort, "sort_code"):
-                return isort.sort_code(code)
-        except Exception:
-            return code
-        return code
-
-    HAS_ISORT = True
-except ImportError:
-    isort_api = None
-
-    def sort_code_with_isort(code: str) -> str:
-        return code
-    HAS_ISORT = False
-
-try:
-    import autopep8
-    HAS_AUTOPEP8 = True
-except ImportError:
-    autopep8 = None
-    HAS_AUTOPEP8 = False
-    print("Warning: autopep8 not installed. Code formatting will be disabled.")
+POLL_MS = 50
 
 
 class CodeCleanerApp:
-    def __init__(self, app, backend_url="http://127.0.0.1:8000"):
+    def __init__(self, app, backend_url="http://127.0.0.1:8000",
+                 paged_threshold=PAGED_THRESHOLD):
         self.backend_url = backend_url
+        self._client = None
+        self.cache = ResultCache()
+        self.worker = CleanWorker(self.cache,
+                                  profile=os.environ.get("CODE_CLEANER_PROFILE"))
+        self._polling = False
+        self.paged_threshold = paged_threshold
+        self.views = {}
+        self._temp_paths = set()
+        self._clean_to_file = None
+        self.source_format = DEFAULT_FORMAT
         self.app = app
         self.app.title("Python Code Cleaner - Dark Mode")
         self.app.geometry("1000x700")
@@ -83,10 +49,13 @@ class CodeCleanerApp:
         self.text_font = ("Consolas", 12)
 
         self.remove_comments = ttk.BooleanVar(value=True)
+        self.inline_comments = ttk.BooleanVar(value=False)
         self.trim_whitespace = ttk.BooleanVar(value=True)
         self.collapse_blank_lines = ttk.BooleanVar(value=True)
         self.format_code = ttk.BooleanVar(value=False)
         self.sort_imports = ttk.BooleanVar(value=False)
+        self.live_preview = ttk.BooleanVar(value=False)
+        self.show_changes = ttk.BooleanVar(value=False)
 
         top_frame = ttk.Frame(self.app, padding=8)
         top_frame.pack(side=TOP, fill=X)
@@ -96,6 +65,8 @@ class CodeCleanerApp:
 
         ttk.Checkbutton(top_frame, text="Remove full-line comments", variable=self.remove_comments,
                         bootstyle="round-toggle").pack(side=LEFT, padx=5)
+        ttk.Checkbutton(top_frame, text="Inline comments too", variable=self.inline_comments,
+                        bootstyle="round-toggle").pack(side=LEFT, padx=5)
         ttk.Checkbutton(top_frame, text="Trim trailing whitespace", variable=self.trim_whitespace,
                         bootstyle="round-toggle").pack(side=LEFT, padx=5)
         ttk.Checkbutton(top_frame, text="Collapse blank lines", variable=self.collapse_blank_lines,
@@ -112,8 +83,15 @@ class CodeCleanerApp:
             ttk.Checkbutton(top_frame, text="Sort imports (isort)", variable=self.sort_imports,
                             bootstyle="round-toggle").pack(side=LEFT, padx=5)
 
+        ttk.Checkbutton(top_frame, text="Highlight changes", variable=self.show_changes,
+                        bootstyle="round-toggle").pack(side=LEFT, padx=5)
+        ttk.Checkbutton(top_frame, text="Live preview", variable=self.live_preview,
+                        command=self.toggle_live, bootstyle="round-toggle").pack(side=LEFT, padx=5)
+
         ttk.Button(top_frame, text="Clean Code ▶", command=self.clean_code,
                    bootstyle="success-outline").pack(side=LEFT, padx=10)
+        ttk.Button(top_frame, text="Cancel", command=self.cancel_clean,
+                   bootstyle="danger-outline").pack(side=LEFT, padx=5)
         ttk.Button(top_frame, text="Swap Input/Output", command=self.swap_text,
                    bootstyle="info-outline").pack(side=LEFT, padx=5)
         ttk.Button(top_frame, text="Validate Syntax", command=self.validate_syntax,
@@ -128,19 +106,24 @@ class CodeCleanerApp:
         pw.pack(fill=BOTH, expand=TRUE, padx=10, pady=5)
 
         input_frame = ttk.Labelframe(pw, text="Input Code", bootstyle="dark")
-        self.input_text = ttk.Text(input_frame, wrap="none", undo=True, font=self.text_font,
+        self.input_text = ttk.Text(pw, wrap="none", undo=True, font=self.text_font,
                                    background=self.text_bg, foreground=self.text_fg,
                                    insertbackground="white", height=15)
-        self.input_text.pack(fill=BOTH, expand=TRUE)
+        self.input_text.pack(in_=input_frame, fill=BOTH, expand=TRUE)
+        self.input_text.lift()
         pw.add(input_frame)
 
         output_frame = ttk.Labelframe(
             pw, text="Cleaned Output", bootstyle="dark")
-        self.output_text = ttk.Text(output_frame, wrap="none", undo=True, font=self.text_font,
+        self.output_text = ttk.Text(pw, wrap="none", undo=True, font=self.text_font,
                                     background=self.text_bg, foreground=self.text_fg,
                                     insertbackground="white", height=15)
-        self.output_text.pack(fill=BOTH, expand=TRUE)
+        self.output_text.pack(in_=output_frame, fill=BOTH, expand=TRUE)
+        self.output_text.lift()
         pw.add(output_frame)
+        for text in (self.input_text, self.output_text):
+            text.tag_configure("changed", background="#3d3a1a")
+            text.tag_configure("removed", underline=True)
 
         menubar = ttk.Menu(self.app, background="#2b2b2b",
                            foreground="#f5f5f5", activebackground="#3b3b3b")
@@ -148,6 +131,8 @@ class CodeCleanerApp:
         file_menu.add_command(label="Open File", command=self.open_file)
         file_menu.add_command(label="Save Cleaned Output",
                               command=self.save_output)
+        file_menu.add_command(label="Clean Folder and Send to Backend",
+                              command=self.send_folder_to_backend)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.app.quit)
         menubar.add_cascade(label="File", menu=file_menu)
@@ -157,83 +142,271 @@ class CodeCleanerApp:
                                 anchor=W, bootstyle="inverse-dark")
         self.status.pack(side=BOTTOM, fill=X)
 
+        self.live = LivePreview(self.input_text, self.output_text,
+                                self._live_options)
+        for var in (self.remove_comments, self.inline_comments,
+                    self.trim_whitespace, self.collapse_blank_lines):
+            var.trace_add("write", lambda *args: self.live.resync())
+
+        for text in (self.input_text, self.output_text):
+            text.bind("<Control-Next>", lambda e: self._turn_page(e.widget, 1))
+            text.bind("<Control-Prior>", lambda e: self._turn_page(e.widget, -1))
+
         self.app.bind("<Control-o>", lambda e: self.open_file())
         self.app.bind("<Control-s>", lambda e: self.save_output())
         self.app.bind("<Control-e>", lambda e: self.clean_code())
 
+    def _live_options(self):
+        return {
+            "remove_comments": self.remove_comments.get(),
+            "comment_mode": "tokenize" if self.inline_comments.get() else "line",
+            "trim_trailing": self.trim_whitespace.get(),
+            "collapse_blank": self.collapse_blank_lines.get(),
+        }
+
+    def _clean_options(self):
+        return dict(self._live_options(),
+                    use_autopep8=bool(HAS_AUTOPEP8 and self.format_code.get()),
+                    sort_imports=bool(HAS_ISORT and self.sort_imports.get()))
+
+    def _close_view(self, widget):
+        view = self.views.pop(widget, None)
+        if view is None:
+            return
+        view.close()
+        if view.document.path in self._temp_paths:
+            self._temp_paths.discard(view.document.path)
+            os.remove(view.document.path)
+
+    def _load_path(self, widget, path):
+        """Load ``path`` into ``widget``; returns True if it is paged."""
+        self._close_view(widget)
+        widget.delete("1.0", "end")
+        self.source_format = sniff_file(path)
+        encoding = self.source_format.encoding
+        if os.path.getsize(path) > self.paged_threshold:
+            self.views[widget] = PagedView(widget, PagedFile(path, encoding=encoding))
+            return True
+        with open(path, "r", encoding=encoding) as f:
+            insert_chunked(widget, f)
+        return False
+
+    def _turn_page(self, widget, step):
+        view = self.views.get(widget)
+        if view is None:
+            return
+        view.show(view.number + step)
+        self.status.config(text=f"{os.path.basename(view.document.path)}: {view.label}")
+        return "break"
+
+    def _discard_clean_file(self):
+        if self._clean_to_file:
+            try:
+                os.remove(self._clean_to_file)
+            except OSError:
+                pass
+        self._clean_to_file = None
+
+    def toggle_live(self):
+        if self.live_preview.get() and self.input_text in self.views:
+            self.live_preview.set(False)
+            self.status.config(text="Live preview is not available for paged files")
+        elif self.live_preview.get():
+            self.worker.cancel()
+            self._clear_changes()
+            self.live.enable()
+            self.status.config(text="Live preview on")
+        else:
+            self.live.disable()
+            self.status.config(text="Live preview off")
+
     def clean_code(self):
+        if self.live_preview.get():
+            self.live_preview.set(False)
+            self.live.disable()
+        self._discard_clean_file()
+        view = self.views.get(self.input_text)
+        if view is not None:
+            fd, self._clean_to_file = tempfile.mkstemp(suffix=".py")
+            os.close(fd)
+            self.worker.submit_file(view.document.path, self._clean_to_file,
+                                    **self._live_options())
+            self._start_polling()
+            return
         code = self.input_text.get("1.0", "end-1c")
-        original_lines = code.splitlines()
-        lines = original_lines.copy()
-        cleaned = []
-
-        if self.trim_whitespace.get():
-            lines = [line.rstrip() for line in lines]
-
-        comments_before = sum(1 for l in lines if re.match(r'^\s*#', l))
-        if self.remove_comments.get():
-            lines = [line for line in lines if not re.match(r'^\s*#', line)]
-
-        if self.collapse_blank_lines.get():
-            blank_count = 0
-            new_lines = []
-            for line in lines:
-                if line.strip() == "":
-                    blank_count += 1
+        self.worker.submit(code, changes=self.show_changes.get(),
+                           **self._clean_options())
+        self._start_polling()
+
+    def _start_polling(self):
+        self.status.config(text="Cleaning...")
+        if not self._polling:
+            self._polling = True
+            self.app.after(POLL_MS, self._poll_worker)
+
+    def cancel_clean(self):
+        if self.worker.busy:
+            self.worker.cancel()
+            self._discard_clean_file()
+            self.status.config(text="Cleaning cancelled")
+
+    def _poll_worker(self):
+        for kind, value in self.worker.poll():
+            if kind == "progress":
+                self.status.config(text=f"Cleaning... {value}")
+            elif kind == "done" and self._clean_to_file:
+                path, counts = value
+                self._clean_to_file = None
+                if self._load_path(self.output_text, path):
+                    self._temp_paths.add(path)
+                    label = f"read-only, {self.views[self.output_text].label}, no formatting"
                 else:
-                    blank_count = 0
-                if blank_count <= 1:
-                    new_lines.append(line)
-            lines = new_lines
-
-        cleaned = "\n".join(lines)
-
-        if HAS_AUTOPEP8 and self.format_code.get():
-            cleaned = autopep8.fix_code(cleaned)
-
-        if HAS_ISORT and self.sort_imports.get():
-            try:
-                cleaned = sort_code_with_isort(cleaned)
-            except Exception:
-                pass
+                    os.remove(path)
+                    label = "no formatting"
+                stats = f"Lines: {counts['lines_in']} → {counts['lines_out']} | Comments removed: {counts['comments_removed']}"
+                self.status.config(
+                    text=f"Code cleaned ({label}) — {stats} | {summarize(counts['timings'])}")
+            elif kind == "done":
+                cleaned, counts = value
+                self._close_view(self.output_text)
+                self.output_text.delete("1.0", "end")
+                self.output_text.insert("1.0", cleaned)
+                stats = f"Lines: {counts['lines_in']} → {len(cleaned.splitlines())} | Comments removed: {counts['comments_removed']}"
+                stats += self._show_changes(counts)
+                self.status.config(
+                    text=f"Code cleaned successfully  — {stats} | {summarize(counts['timings'])}")
+            elif kind == "cancelled":
+                self._discard_clean_file()
+                self.status.config(text="Cleaning cancelled")
+            elif kind == "error":
+                self._discard_clean_file()
+                self.status.config(text=f"Cleaning failed: {value} ❌")
+        if self.worker.busy:
+            self.app.after(POLL_MS, self._poll_worker)
+        else:
+            self._polling = False
 
-        self.output_text.delete("1.0", "end")
-        self.output_text.insert("1.0", cleaned)
+    def _show_changes(self, counts):
+        """Highlight what cleaning changed; returns a status bar suffix."""
+        self._clear_changes()
+        if not self.show_changes.get() or "changes" not in counts:
+            return ""
+        runs = highlight_changes(self.output_text, counts["changes"])
+        return f" | Changed hunks: {runs}"
 
-        cleaned_lines = cleaned.splitlines()
-        removed_comments = comments_before - \
-            sum(1 for l in cleaned_lines if re.match(r'^\s*#', l))
-        stats = f"Lines: {len(original_lines)} → {len(cleaned_lines)} | Comments removed: {max(0, removed_comments)}"
-        self.status.config(text=f"Code cleaned successfully  — {stats}")
+    def _clear_changes(self):
+        for text in (self.input_text, self.output_text):
+            text.tag_remove("changed", "1.0", "end")
+            text.tag_remove("removed", "1.0", "end")
 
     def swap_text(self):
-        input_content = self.input_text.get("1.0", "end-1c")
-        output_content = self.output_text.get("1.0", "end-1c")
-        self.input_text.delete("1.0", "end")
-        self.output_text.delete("1.0", "end")
-        self.input_text.insert("1.0", output_content)
-        self.output_text.insert("1.0", input_content)
+        swap_slots(self.input_text, self.output_text)
+        self.input_text, self.output_text = self.output_text, self.input_text
+        if self.input_text in self.views and self.live_preview.get():
+            self.live_preview.set(False)
+            self.live.disable()
+        self.live.swap()
         self.status.config(text="Input and Output swapped ")
 
     def open_file(self):
         path = filedialog.askopenfilename(
             filetypes=[("Python Files", "*.py"), ("All Files", "*.*")])
         if path:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-            self.input_text.delete("1.0", "end")
-            self.input_text.insert("1.0", content)
-            self.status.config(text=f"Opened file: {path}")
+            if self.live_preview.get():
+                self.live_preview.set(False)
+                self.live.disable()
+            if self._load_path(self.input_text, path):
+                view = self.views[self.input_text]
+                self.status.config(
+                    text=f"Opened file read-only, {view.label} (Ctrl+PgUp/PgDn): {path}")
+            else:
+                self.status.config(text=f"Opened file: {path}")
 
     def save_output(self):
         path = filedialog.asksaveasfilename(defaultextension=".py",
                                             filetypes=[("Python Files", "*.py"), ("All Files", "*.*")])
         if path:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(self.output_text.get("1.0", "end-1c"))
+            view = self.views.get(self.output_text)
+            head = (self.output_text.get("1.0", "3.0") if view is None
+                    else view.document.page(0))
+            fmt = output_format(head, self.source_format)
+            with PatchWriter(path, fmt.encoding, fmt.newline) as f:
+                if view is not None:
+                    with open(view.document.path, "r",
+                              encoding=view.document.encoding) as src:
+                        shutil.copyfileobj(src, f)
+                else:
+                    write_chunked(self.output_text, f)
+            if not f.changed:
+                self.status.config(text=f"Output unchanged: {path}")
+                return
             self.status.config(text=f"Output saved to: {path}")
             messagebox.showinfo("Saved", f"Output saved to:\n{path}")
 
+    @property
+    def client(self):
+        # requests is only imported once something is actually sent
+        if self._client is None:
+            from cleaner_client import BackendClient
+            self._client = BackendClient(self.backend_url)
+        return self._client
+
+    def send_to_backend(self):
+        cleaned_code = self.output_text.get("1.0", "end-1c")
+        if not cleaned_code.strip():
+            messagebox.showwarning("Warning", "No cleaned code to send!")
+            return
+        self.status.config(text="Sending to backend...")
+        self._poll_uploads([self.client.upload_async(cleaned_code)])
+
+    def send_folder_to_backend(self):
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+        paths = list(iter_python_files([folder]))
+        if not paths:
+            messagebox.showwarning("Warning", "No Python files in that folder!")
+            return
+        options = self._clean_options()
+
+        def cleaned_files():
+            for path in paths:
+                with open(path, "rb") as f:
+                    code = cached_clean_source(decode(f.read())[0], cache=self.cache,
+                                               **options)
+                yield os.path.relpath(path, folder), code
+
+        self.status.config(text=f"Cleaning and sending {len(paths)} files to backend...")
+        self._poll_uploads([self.client.upload_bulk_async(cleaned_files())])
+
+    def _poll_uploads(self, futures):
+        done = sum(1 for f in futures if f.done())
+        if done < len(futures):
+            if len(futures) > 1:
+                self.status.config(text=f"Sending to backend... {done}/{len(futures)}")
+            self.app.after(POLL_MS, self._poll_uploads, futures)
+            return
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if len(futures) == 1 and not errors:
+            res = futures[0].result()
+            messagebox.showinfo("Success", f"✅ {res['message']}")
+            if res.get("failed"):
+                self.status.config(
+                    text=f"{res['failed']} of {len(res['files'])} files failed to save ❌")
+            else:
+                self.status.config(text="Cleaned code sent to backend ✅")
+        elif not errors:
+            messagebox.showinfo("Success", f"✅ {len(futures)} files sent to backend")
+            self.status.config(text=f"{len(futures)} cleaned files sent to backend ✅")
+        elif getattr(errors[0], "response", None) is not None:
+            messagebox.showerror("Error", f"Backend error: {errors[0].response.text}")
+            self.status.config(
+                text=f"Backend returned an error for {len(errors)}/{len(futures)} files ❌")
+        else:
+            messagebox.showerror("Connection Error", str(errors[0]))
+            self.status.config(
+                text=f"Failed to send {len(errors)}/{len(futures)} files to backend ❌")
+
     def copy_output(self):
         out = self.output_text.get("1.0", "end-1c")
         if out:
@@ -245,19 +418,29 @@ class CodeCleanerApp:
                 self.status.config(text="Failed to copy to clipboard")
 
     def validate_syntax(self):
-        code = self.output_text.get(
-            "1.0", "end-1c") or self.input_text.get("1.0", "end-1c")
+        source = self.input_text.get("1.0", "end-1c")
+        code = self.output_text.get("1.0", "end-1c") or source
         try:
             ast.parse(code)
-            messagebox.showinfo("Syntax Check", "No syntax errors found ")
-            self.status.config(text="Syntax valid ")
         except SyntaxError as e:
             messagebox.showerror(
                 "Syntax Error", f"SyntaxError: {e.msg}\nLine: {e.lineno}, Offset: {e.offset}")
             self.status.config(text=f"Syntax error at line {e.lineno} ")
+            return
+        try:
+            verify(source, code)
+        except VerificationError as e:
+            messagebox.showwarning("Syntax Check", f"No syntax errors, but {e}")
+            self.status.config(text="Output differs from input in meaning ")
+            return
+        messagebox.showinfo("Syntax Check", "No syntax errors found ")
+        self.status.config(text="Syntax valid ")
 
 
 if __name__ == "__main__":
+    setup_logging()
+    if not HAS_AUTOPEP8:
+        print("Warning: autopep8 not installed. Code formatting will be disabled.")
     app = ttk.Window(themename="darkly")
     CodeCleanerApp(app)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """The backend module with its store, cache and queues under ``tmp_path``."""
+    pytest.importorskip("fastapi")
+    # importing backend creates its save directory in the working directory
+    monkeypatch.chdir(tmp_path)
+    import backend
+    from backend_jobs import JobQueue
+    from backend_store import CodeStore, WriteQueue
+    from cleaner_cache import ResultCache
+
+    store = CodeStore(str(tmp_path / "store"))
+    monkeypatch.setattr(backend, "STORE", store)
+    monkeypatch.setattr(backend, "WRITES", WriteQueue(store, fsync=False))
+    monkeypatch.setattr(backend, "CACHE", ResultCache(str(tmp_path / "cache")))
+    monkeypatch.setattr(backend, "JOBS", JobQueue(workers=1))
+    # the app's lifespan shuts the pool down, so each test gets a new one
+    monkeypatch.setattr(backend, "_analysis_pool", None)
+    return backend
+
+
+@pytest.fixture
+def client(backend):
+    from fastapi.testclient import TestClient
+    with TestClient(backend.app) as client:
+        yield client
@@ -0,0 +1,101 @@
+import ast
+
+SOURCE = '''\
+import os
+from . import util  # relative
+
+
+def f(x):
+    if x and os:
+        for i in x:
+            pass
+    return [i for i in x if i if i > 1]
+
+
+class C:
+    def m(self):
+        try:
+            pass
+        except ValueError:
+            pass
+        else:
+            pass
+
+        def inner():
+            while True:
+                pass
+'''
+
+
+def analyze(client, code):
+    return client.post("/analyze_code/", json={"cleaned_code": code})
+
+
+def test_complexity_and_counts(client):
+    response = analyze(client, SOURCE)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["syntax_error"] is None
+    assert body["functions"] == [
+        {"name": "f", "line": 5, "complexity": 7},
+        {"name": "C.m", "line": 13, "complexity": 3},
+        {"name": "C.m.inner", "line": 21, "complexity": 2},
+    ]
+    assert body["max_complexity"] == 7
+    assert body["imports"] == {"statements": 2,
+                               "modules": {"os": 1, ".": 1}}
+    assert (body["lines"], body["blank_lines"], body["comment_lines"]) == \
+        (23, 5, 1)
+    assert body["blank_runs"] == {"count": 3, "longest": 2, "multi_line": 2}
+
+
+def test_syntax_error_location(client):
+    code = "x = 1\ndef f(:\n    pass\n"
+    body = analyze(client, code).json()
+    assert body["status"] == "syntax_error"
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        expected = {"message": e.msg, "line": 2, "offset": e.offset}
+    assert body["syntax_error"] == expected
+    assert body["functions"] == [] and body["max_complexity"] == 0
+    assert body["lines"] == 3
+
+
+def test_full_analysis_queue_answers_503(backend, client, monkeypatch):
+    monkeypatch.setattr(backend, "ANALYSIS_MAX_PENDING", 0)
+    response = analyze(client, "x = 1\n")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_analysis_slots_are_given_back(backend, client):
+    analyze(client, "x = 1\n")
+    analyze(client, "def f(:\n")
+    assert backend._analysis_pending == 0
+    assert client.get("/metrics").json()["analysis_queue_depth"] == 0
+
+
+def test_oversized_body_answers_413(backend, client):
+    size = backend.MAX_BODY + 1
+    response = client.post("/analyze_code/", content=b" " * size,
+                           headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    # without a Content-Length the limit trips while the body streams in
+    response = client.post("/analyze_code/", content=iter([b" " * size]),
+                           headers={"content-type": "application/json"})
+    assert response.status_code == 413
+
+
+def test_busy_client_answers_429(backend, client, monkeypatch):
+    monkeypatch.setattr(backend.LIMITS, "per_client", 1)
+    # TestClient requests come from "testclient"; pretend one is in flight
+    monkeypatch.setitem(backend.LIMITS.active, "testclient", 1)
+    rejected = backend.LIMITS.rejected
+    response = analyze(client, "x = 1\n")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert backend.LIMITS.rejected == rejected + 1
+    monkeypatch.delitem(backend.LIMITS.active, "testclient")
+    assert analyze(client, "x = 1\n").status_code == 200
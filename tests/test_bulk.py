@@ -0,0 +1,120 @@
+import asyncio
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+TAR = {"content-type": "application/x-tar"}
+ZIP = {"content-type": "application/zip"}
+
+
+def make_tar(files):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def make_zip(files):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def statuses(response):
+    return {f["name"]: f["status"] for f in response.json()["files"]}
+
+
+@pytest.mark.parametrize("make, headers", [(make_tar, TAR), (make_zip, ZIP)])
+def test_archive_members_are_stored(backend, client, make, headers):
+    body = make({"a.py": b"x = 1\n", "pkg/b.py": b"y = 2\n", "../up.py": b"z\n"})
+    response = client.post("/upload_bulk/", content=body, headers=headers)
+    assert response.status_code == 200
+    assert statuses(response) == {"a.py": "success", "pkg/b.py": "success",
+                                  "up.py": "success"}
+    with open(backend.STORE.index_path) as index:
+        assert len(index.readlines()) == 3
+
+
+@pytest.mark.parametrize("make, headers", [(make_tar, TAR), (make_zip, ZIP)])
+def test_oversized_member_is_refused(backend, client, monkeypatch, make, headers):
+    monkeypatch.setattr(backend, "MAX_MEMBER_SIZE", 1000)
+    # zeros compress to almost nothing: the body is tiny, the member is not
+    body = make({"bomb.py": b"\0" * 100_000, "ok.py": b"x = 1\n"})
+    response = client.post("/upload_bulk/", content=body, headers=headers)
+    assert response.json()["status"] == "partial"
+    assert statuses(response) == {"bomb.py": "error", "ok.py": "success"}
+
+
+def test_member_lying_about_its_size_is_cut_off(backend):
+    reads = []
+
+    class Member(io.BytesIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    with pytest.raises(ValueError, match="over the 100 byte limit"):
+        backend._read_member(lambda: Member(b"a" * 5000), 10, 100)
+    assert reads == [101]
+
+
+def test_total_unpacked_size_is_limited(backend, client, monkeypatch):
+    monkeypatch.setattr(backend, "MAX_UNPACKED", 10_000)
+    body = make_tar({f"m{i}.py": b"#" * 4000 for i in range(5)})
+    response = client.post("/upload_bulk/", content=body, headers=TAR)
+    assert response.status_code == 413
+
+
+async def post_chunks(app, path, chunks, content_type):
+    """POST ``chunks`` to ASGI ``app`` one message each; returns the status."""
+    messages = [{"type": "http.request", "body": chunk, "more_body": True}
+                for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "POST", "scheme": "http", "path": path, "raw_path":
+             path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"content-type", content_type.encode())],
+             "client": ("127.0.0.1", 1), "server": ("test", 80)}
+    await app(scope, receive, send)
+    return sent[0]["status"]
+
+
+def test_writes_finish_when_ndjson_body_is_cut_off(backend, monkeypatch):
+    from backend_limits import RequestLimits
+
+    done = []
+
+    async def slow_submit(code, name=None, batch_id=None, wait=False):
+        await asyncio.sleep(0.2)
+        done.append(name)
+        return {"id": name, "sha256": "", "filename": name,
+                "deduplicated": False}
+
+    monkeypatch.setattr(backend.WRITES, "submit", slow_submit)
+    line = json.dumps({"filename": "a.py", "cleaned_code": "x = 1\n"}) + "\n"
+    # TestClient sends the body as one message, so drive the app directly
+    stack = backend.app.build_middleware_stack()
+    monkeypatch.setattr(backend.app, "middleware_stack", stack)
+    while not isinstance(stack, RequestLimits):
+        stack = stack.app
+    stack.body_limits["/upload_bulk/"] = len(line) * 2
+    status = asyncio.run(post_chunks(backend.app, "/upload_bulk/",
+                                     [line.encode()] * 5, "application/x-ndjson"))
+    assert status == 413
+    assert done == ["a.py", "a.py"]
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from cleaner_client import BackendClient  # noqa: E402
+
+
+class StubServer(ThreadingHTTPServer):
+    """Answers from ``replies``, a list of ``(status, delay)`` per request."""
+
+    daemon_threads = True
+
+    def __init__(self, replies):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.replies = list(replies)
+        self.requests = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        self.server.requests.append((self.command, self.path, body))
+        status, delay = self.server.replies.pop(0) if self.server.replies \
+            else (200, 0)
+        time.sleep(delay)
+        data = json.dumps({"status": "success", "job_id": "j"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(replies=()):
+        server = StubServer(replies)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_post_is_not_resent_after_a_read_timeout(stub):
+    server, url = stub([(200, 0.5)] * 4)
+    client = BackendClient(url, timeout=0.1, backoff=0)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.upload("x = 1\n")
+    client.close()
+    assert len(server.requests) == 1
+
+
+def test_post_is_not_resent_after_a_server_error(stub):
+    server, url = stub([(503, 0)] * 4)
+    client = BackendClient(url, backoff=0)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.upload("x = 1\n")
+    client.close()
+    assert len(server.requests) == 1
+
+
+def test_get_is_retried(stub):
+    server, url = stub([(503, 0), (503, 0)])
+    client = BackendClient(url, backoff=0)
+    assert client.job_status("j")["status"] == "success"
+    client.close()
+    assert len(server.requests) == 3
+
+
+def test_bulk_upload_waits_for_bulk_timeout(stub):
+    server, url = stub([(200, 0.3)])
+    client = BackendClient(url, timeout=0.1, bulk_timeout=5, backoff=0)
+    assert client.upload_bulk([("a.py", "x = 1\n")])["status"] == "success"
+    client.close()
+    assert len(server.requests) == 1
+    assert json.loads(server.requests[0][2]) == {"filename": "a.py",
+                                                 "cleaned_code": "x = 1\n"}
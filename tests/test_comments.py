@@ -0,0 +1,44 @@
+import ast
+
+import pytest
+
+from cleaner_engine import clean
+from cleaner_rules import strip_comments
+
+
+def tokenize_clean(source, stats=None):
+    return clean(source, remove_comments=True, comment_mode="tokenize",
+                 stats=stats)
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("x = 1  # one\n# full\ny = 2\n", "x = 1\ny = 2\n"),
+    ("s = '# not a comment'  # cut\n", "s = '# not a comment'\n"),
+    ('s = """\n# inside a string\n"""\n', 's = """\n# inside a string\n"""\n'),
+    ("#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n# gone\nx = 1\n",
+     "#!/usr/bin/env python\n# -*- coding: utf-8 -*-\nx = 1\n"),
+    # dropping the comment would continue "x = 1 \" into "y = 2"
+    ("x = 1 \\\n# note\ny = 2\n", "x = 1 \\\n\ny = 2\n"),
+    ("x = 1 \\\n# a\n# b\ny = 2\n", "x = 1 \\\n\ny = 2\n"),
+    ("x = (1,\n# inside brackets\n     2)\n", "x = (1,\n     2)\n"),
+])
+def test_tokenize_comments(source, expected):
+    cleaned = tokenize_clean(source)
+    assert cleaned == expected
+    ast.parse(cleaned)
+
+
+def test_backslash_comment_is_counted():
+    stats = {}
+    tokenize_clean("x = 1 \\\n# note\ny = 2  # two\n", stats)
+    assert stats == {"lines_in": 3, "lines_out": 3, "comments_removed": 2}
+
+
+def test_untokenizable_rest_is_kept():
+    lines = ["x = 1  # cut", "s = '''", "# inside", "never closed"]
+    assert list(strip_comments(lines)) == ["x = 1"] + lines[1:]
+
+
+def test_one_item_per_line():
+    lines = ["# a", "x = 1  # b", "", "# c"]
+    assert list(strip_comments(lines)) == [None, "x = 1", "", None]
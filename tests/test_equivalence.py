@@ -0,0 +1,198 @@
+"""Randomized checks that the fast paths agree with the plain ones."""
+import codecs
+import random
+
+import pytest
+
+from cleaner_batch import clean_file
+from cleaner_chunked import clean_chunked
+from cleaner_encoding import ascii_compatible, decode, detect_format, encode
+from cleaner_engine import clean_bytes, clean_source, iter_blocks, write_blocks
+from cleaner_rules import COMMENT_RE, Pipeline, rules_for
+
+PIECES = ["x = 1", "", "   ", "# c", "  # indented", "\ty = 2\t", "s = '#'  ",
+          "def f():", "    return 2  # hi", "\t\tz = '\t'", "\ufeffb = 1",
+          "é = 'ü'  ", "\xa0", "z=1\x0c", "'''", "(1,", "#!/usr/bin/env python",
+          "# -*- coding: utf-8 -*-"]
+FLAGS = [(c, t, b) for c in (False, True) for t in (False, True)
+         for b in (False, True)]
+
+
+def random_lines(rng, pieces=PIECES, most=14):
+    return [rng.choice(pieces) for _ in range(rng.randint(0, most))]
+
+
+def reference_lines(lines, remove_comments, trim_trailing, collapse_blank,
+                    rules=()):
+    """The line rules one at a time over a list, written out longhand."""
+    lines = list(lines)
+    removed = 0
+    if "strip_bom" in rules and lines:
+        lines[0] = lines[0].lstrip("\ufeff")
+    if "tabs_to_spaces" in rules:
+        lines = [line[:len(line) - len(line.lstrip(" \t"))].expandtabs(4)
+                 + line.lstrip(" \t") for line in lines]
+    if trim_trailing:
+        lines = [line.rstrip() for line in lines]
+    if remove_comments:
+        kept = [line for line in lines if not COMMENT_RE.match(line)]
+        removed = len(lines) - len(kept)
+        lines = kept
+    if collapse_blank:
+        kept = []
+        for line in lines:
+            if line.strip() == "" and kept and kept[-1].strip() == "":
+                continue
+            kept.append(line)
+        lines = kept
+    return lines, removed
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_pipeline_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        lines = random_lines(rng)
+        flags = rng.choice(FLAGS)
+        rules = rng.sample(["strip_bom", "tabs_to_spaces"], rng.randint(0, 2))
+        stats = {}
+        out = list(Pipeline(rules_for(*flags, rules=rules)).lines(lines, stats))
+        expected, removed = reference_lines(lines, *flags, rules=rules)
+        assert out == expected, (lines, flags, rules)
+        assert stats == {"lines_in": len(lines), "lines_out": len(expected),
+                         "comments_removed": removed}
+
+
+def random_blocks(rng, lines):
+    blocks = []
+    while lines:
+        size = rng.randint(0, 5)
+        blocks.append(lines[:size])
+        lines = lines[size:]
+    return blocks
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_blocks_match_reference(seed):
+    rng = random.Random(100 + seed)
+    for _ in range(300):
+        lines = random_lines(rng, most=30)
+        flags = rng.choice(FLAGS)
+        rules = rng.sample(["strip_bom", "tabs_to_spaces"], rng.randint(0, 2))
+        pipeline = Pipeline(rules_for(*flags, rules=rules))
+        parts = []
+        write_blocks(pipeline.blocks(random_blocks(rng, lines)), parts.append)
+        expected, _ = reference_lines(lines, *flags, rules=rules)
+        assert "".join(parts) == "\n".join(expected).rstrip() + "\n", \
+            (lines, flags, rules)
+
+
+def test_iter_blocks_splits_like_str_split():
+    rng = random.Random(5)
+    for _ in range(500):
+        source = "".join(rng.choice(["a", "bc", " ", "\n", "\r\n", "\r"])
+                         for _ in range(rng.randint(0, 30)))
+        expected = [line.rstrip("\r") for line in source.split("\n")]
+        if source.endswith("\n") or not source:
+            expected.pop()
+        size = rng.randint(1, 8)
+        assert [line for block in iter_blocks(source, size)
+                for line in block] == expected, (source, size)
+
+
+@pytest.mark.parametrize("comment_mode", ["line", "tokenize"])
+def test_fused_matches_split_passes(comment_mode):
+    rng = random.Random(17)
+    for _ in range(400):
+        newline = rng.choice(["\n", "\r\n"])
+        source = newline.join(random_lines(rng)) + rng.choice(["", newline])
+        flags = rng.choice(FLAGS)
+        rules = rng.sample(["strip_bom", "tabs_to_spaces"], rng.randint(0, 2))
+        fused_stats = {}
+        split_stats = {}
+        fused = clean_source(source, *flags, stats=fused_stats,
+                             comment_mode=comment_mode, rules=rules)
+        split = clean_source(source, *flags, stats=split_stats,
+                             comment_mode=comment_mode, rules=rules,
+                             split_passes=True)
+        assert fused == split, (source, flags, rules)
+        assert fused_stats == split_stats
+
+
+def test_clean_bytes_matches_text_path():
+    rng = random.Random(20)
+    pieces = PIECES + ["\x0b ", " \x0c\t", "\t", "x = 1\u3000", "y\x1c", "a\x1f "]
+    fast_runs = 0
+    for _ in range(2000):
+        newline = rng.choice(["\n", "\r\n"])
+        # mostly ASCII, so that the bytes path gets to run
+        choices = pieces if rng.random() < 0.3 else PIECES[:10]
+        text = newline.join(random_lines(rng, choices)) + rng.choice(["", newline])
+        data = text.encode("utf-8")
+        if rng.random() < 0.3:
+            data = b"\xef\xbb\xbf" + data
+        fmt = detect_format(data)
+        assert ascii_compatible(fmt.encoding)
+        flags = (False, True, rng.random() < 0.5)
+        fast_stats = {}
+        text_stats = {}
+        fast = clean_bytes(data, *flags, newline=fmt.newline, stats=fast_stats)
+        decoded, text_fmt = decode(data, fmt)
+        slow = encode(clean_source(decoded, *flags, stats=text_stats), text_fmt)
+        if fast is None:
+            continue
+        fast_runs += 1
+        assert fast == slow, (data, flags)
+        assert fast_stats == text_stats
+    assert fast_runs > 1000
+
+
+@pytest.mark.parametrize("text", ["x = 1\xa0\ny = 2\n", "x = 1\u3000\n",
+                                  "x = 1\x1c\n", "x = '\xe9'\n"])
+def test_clean_bytes_leaves_other_whitespace_to_text_path(text):
+    assert clean_bytes(text.encode("utf-8")) is None
+    assert clean_bytes(codecs.BOM_UTF8 + text.encode("utf-8")) is None
+
+
+def test_clean_file_takes_bytes_path_with_bom(tmp_path):
+    path = tmp_path / "bom.py"
+    path.write_bytes(codecs.BOM_UTF8 + b"x = 1   \r\n\r\n\r\n\r\ny = 2\r\n\r\n")
+    result = clean_file(str(path), {}, write=True)
+    assert result[1]
+    assert path.read_bytes() == codecs.BOM_UTF8 + b"x = 1\r\n\r\ny = 2\r\n"
+    # one record means clean_bytes ran instead of the per-pass text path
+    assert [t["pass"] for t in result[5]] == ["clean"]
+
+
+def test_clean_chunked_matches_clean_file(tmp_path):
+    rng = random.Random(24)
+    options = [{}, {"remove_comments": True}, {"collapse_blank": False},
+               {"trim_trailing": False},
+               {"trim_trailing": False, "remove_comments": True},
+               {"rules": ["tabs_to_spaces"]},
+               {"rules": ["strip_bom"], "remove_comments": True}]
+    serial = tmp_path / "serial.py"
+    chunked = tmp_path / "chunked.py"
+    compared = 0
+    for _ in range(60):
+        newline = rng.choice(["\n", "\r\n"])
+        text = newline.join(random_lines(rng, most=40)) + \
+            rng.choice(["", newline, newline * 3])
+        encoding = rng.choice(["utf-8", "latin-1"])
+        if encoding == "latin-1":
+            text = "# -*- coding: latin-1 -*-" + newline + text
+        data = text.encode(encoding, "replace")
+        if rng.random() < 0.1:
+            data = data.replace(b"\n", b"\r", 1)
+        opts = rng.choice(options)
+        serial.write_bytes(data)
+        chunked.write_bytes(data)
+        result = clean_file(str(serial), opts, write=True)
+        changed = clean_chunked(str(chunked), opts, write=True, jobs=2,
+                                chunk_size=rng.randint(1, 30))
+        if changed is None:
+            continue
+        compared += 1
+        assert chunked.read_bytes() == serial.read_bytes(), (data, opts)
+        assert changed == result[1]
+    assert compared > 20
@@ -0,0 +1,21 @@
+import pytest
+
+from cleaner_format import get_formatter
+
+autopep8 = pytest.importorskip("autopep8")
+
+# characters str.splitlines treats as line breaks but Python source does not
+SPLITLINES_BREAKS = "\x0b\x0c\x1c\x1d\x1e\x85  "
+
+
+@pytest.mark.parametrize("char", SPLITLINES_BREAKS)
+def test_autopep8_matches_fix_code(char):
+    code = f'x=1\ns = "a{char}b"\ndef f( a ):\n  return a\n'
+    assert get_formatter().autopep8(code) == autopep8.fix_code(code)
+
+
+@pytest.mark.parametrize("char", SPLITLINES_BREAKS)
+def test_autopep8_line_range_keeps_string(char):
+    code = f'x=1\ns = "a{char}b"\ny=2\n'
+    assert get_formatter().autopep8(code, (3, 3)) == \
+        f'x=1\ns = "a{char}b"\ny = 2\n'
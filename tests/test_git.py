@@ -0,0 +1,114 @@
+import pytest
+
+from cleaner_git import parse_diff
+
+MODIFIED = """\
+diff --git a.py a.py
+index 1111111..2222222 100644
+--- a.py
++++ a.py
+@@ -3 +3 @@ def f():
+-    return 1
++    return 2
+@@ -10,0 +11,2 @@
++x = 1
++y = 2
+"""
+
+DELETED_LINES = """\
+--- a.py
++++ a.py
+@@ -4,2 +3,0 @@
+-
+-
+@@ -1 +0,0 @@
+-# first line
+"""
+
+RENAMED = """\
+diff --git old.py new.py
+similarity index 90%
+rename from old.py
+rename to new.py
+index 1111111..2222222 100644
+--- old.py
++++ new.py
+@@ -7,0 +8 @@
++z = 3
+"""
+
+PURE_RENAME = """\
+diff --git old.py new.py
+similarity index 100%
+rename from old.py
+rename to new.py
+"""
+
+NEW_FILE = """\
+diff --git new.py new.py
+new file mode 100644
+index 0000000..2222222
+--- /dev/null
++++ new.py
+@@ -0,0 +1,3 @@
++a = 1
++
++b = 2
+"""
+
+REMOVED_FILE = """\
+diff --git gone.py gone.py
+deleted file mode 100644
+--- gone.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-a = 1
+-b = 2
+"""
+
+# added lines that look like headers are still hunk bodies
+LOOKALIKES = """\
+--- a.py
++++ a.py
+@@ -1,2 +1,3 @@
+---x
+-y
++++ b.py
++@@ -1 +1 @@
++y
+@@ -9 +10,0 @@
+-z
+"""
+
+NO_NEWLINE = """\
+--- a.py
++++ a.py
+@@ -5 +5,2 @@
+-x = 1
+\\ No newline at end of file
++x = 1
++y = 2
+\\ No newline at end of file
+"""
+
+
+@pytest.mark.parametrize("diff, expected", [
+    ("", {}),
+    (MODIFIED, {"a.py": [(3, 3), (11, 12)]}),
+    (DELETED_LINES, {"a.py": [(3, 4), (1, 1)]}),
+    (RENAMED, {"new.py": [(8, 8)]}),
+    (PURE_RENAME, {}),
+    (NEW_FILE, {"new.py": [(1, 3)]}),
+    (REMOVED_FILE, {}),
+    (MODIFIED + REMOVED_FILE + NEW_FILE,
+     {"a.py": [(3, 3), (11, 12)], "new.py": [(1, 3)]}),
+    (LOOKALIKES, {"a.py": [(1, 3), (10, 11)]}),
+    (NO_NEWLINE, {"a.py": [(5, 6)]}),
+    # only "\n" ends a diff line; file contents may hold other breaks
+    (MODIFIED.replace("= 1\n", "= 1\r\x0c\x1c\r\n"),
+     {"a.py": [(3, 3), (11, 12)]}),
+], ids=["empty", "modified", "deleted-lines", "renamed", "pure-rename",
+        "new-file", "removed-file", "several-files", "lookalikes",
+        "no-newline", "line-breaks-in-content"])
+def test_parse_diff(diff, expected):
+    assert parse_diff(diff) == expected
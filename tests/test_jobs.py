@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+REQUEST = {"code": "x = 1   \n\n\n\ny = 2\n", "remove_comments": True}
+
+
+def wait_for(client, job_id, status):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        body = client.get(f"/jobs/{job_id}").json()
+        if body["status"] == status:
+            return body
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never became {status}")
+
+
+@pytest.fixture
+def held(backend, monkeypatch):
+    """Jobs run on a thread, so doubles need not pickle, until ``held.set()``."""
+    release = threading.Event()
+    clean_job = backend.clean_job
+
+    def held_job(*args):
+        release.wait(30)
+        return clean_job(*args)
+
+    monkeypatch.setattr(backend, "clean_job", held_job)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(backend.JOBS, "_executor", executor)
+    yield release
+    release.set()
+    executor.shutdown()
+
+
+def test_job_runs_to_done(client):
+    response = client.post("/jobs/", json=REQUEST)
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "queued"
+    assert body["status_url"] == f"/jobs/{body['job_id']}"
+    status = wait_for(client, body["job_id"], "done")
+    assert status["finished_at"] >= status["submitted_at"]
+    assert status["error"] is None
+    result = client.get(body["result_url"])
+    assert result.status_code == 200
+    assert result.json()["cleaned_code"] == "x = 1\n\ny = 2\n"
+
+
+def test_result_before_the_job_finishes(client, held):
+    job_id = client.post("/jobs/", json=REQUEST).json()["job_id"]
+    status = wait_for(client, job_id, "running")
+    assert status["finished_at"] is None
+    assert status["queue_depth"] == 1
+    response = client.get(f"/jobs/{job_id}/result")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Job is running"
+    held.set()
+    wait_for(client, job_id, "done")
+    assert client.get(f"/jobs/{job_id}/result").status_code == 200
+
+
+def test_failed_job(backend, client, held, monkeypatch):
+    def broken(*args):
+        raise ValueError("no good")
+
+    monkeypatch.setattr(backend, "clean_job", broken)
+    job_id = client.post("/jobs/", json=REQUEST).json()["job_id"]
+    assert wait_for(client, job_id, "error")["error"] == "ValueError: no good"
+    response = client.get(f"/jobs/{job_id}/result")
+    assert response.status_code == 500
+    assert response.json()["detail"] == "ValueError: no good"
+
+
+@pytest.mark.parametrize("path", ["/jobs/nope", "/jobs/nope/result"])
+def test_unknown_job(client, path):
+    response = client.get(path)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Unknown job id"
+
+
+def test_full_queue_answers_429(backend, client, held, monkeypatch):
+    monkeypatch.setattr(backend.JOBS, "max_pending", 2)
+    first = client.post("/jobs/", json=REQUEST).json()["job_id"]
+    second = client.post("/jobs/", json=REQUEST).json()["job_id"]
+    response = client.post("/jobs/", json=REQUEST)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert client.get(f"/jobs/{second}").json()["status"] == "queued"
+    held.set()
+    wait_for(client, first, "done")
+    wait_for(client, second, "done")
+    assert client.post("/jobs/", json=REQUEST).status_code == 202
@@ -0,0 +1,123 @@
+import random
+import re
+
+import pytest
+
+import cleaner_live
+from cleaner_engine import clean_lines
+from cleaner_live import LiveCleaner, TextEditHook
+
+INDEX_RE = re.compile(r"^(end|\d+\.(?:\d+|end))((?:[+-]\d+c)*)$")
+
+
+class FakeText:
+    """Just enough of a Tk Text widget (and its Tcl command) for the hook."""
+
+    _w = ".text"
+
+    def __init__(self, text):
+        self.buffer = text + "\n"
+        self.commands = {}
+        self.tk = self
+
+    # Tcl side
+    def createcommand(self, name, func):
+        self.commands[name] = func
+
+    def call(self, *args):
+        if args and isinstance(args[0], tuple):
+            args = args[0]
+        if args[0] == "rename":
+            self.commands[args[2]] = self._builtin
+            return ""
+        return self.commands[args[0]](*args[1:])
+
+    def command(self, *args):
+        return self.call(self._w, *args)
+
+    # the widget command the hook wraps
+    def _offset(self, index):
+        base, moves = INDEX_RE.match(str(index)).groups()
+        if base == "end":
+            offset = len(self.buffer)
+        else:
+            line, col = base.split(".")
+            starts = [0] + [m.end() for m in re.finditer("\n", self.buffer)]
+            start = starts[min(int(line), len(starts) - 1) - 1]
+            line_end = self.buffer.index("\n", start)
+            offset = line_end if col == "end" else min(start + int(col), line_end)
+        for move in re.findall(r"[+-]\d+", moves):
+            offset += int(move)
+        return max(0, min(offset, len(self.buffer) - 1))
+
+    def _index(self, offset):
+        line = self.buffer.count("\n", 0, offset) + 1
+        return f"{line}.{offset - (self.buffer.rfind(chr(10), 0, offset) + 1)}"
+
+    def _builtin(self, cmd, *args):
+        if cmd == "index":
+            return self._index(self._offset(args[0]))
+        if cmd == "insert":
+            at = self._offset(args[0])
+            self.buffer = self.buffer[:at] + args[1] + self.buffer[at:]
+            return ""
+        if cmd == "delete":
+            first = self._offset(args[0])
+            last = self._offset(args[1]) if len(args) > 1 else first + 1
+            last = min(last, len(self.buffer) - 1)
+            self.buffer = self.buffer[:first] + self.buffer[max(first, last):]
+            return ""
+        raise ValueError(cmd)
+
+    def lines(self):
+        return self.buffer[:-1].split("\n")
+
+
+def _live_after(text, *edit):
+    widget = FakeText(text)
+    model = LiveCleaner(collapse_blank=False)
+    out = model.reset(widget.lines())
+    edits = []
+    TextEditHook(widget, lambda *e: edits.append(e))
+    widget.command(*edit)
+    for start, old_count, new_count in edits:
+        out_start, out_old, out_new = model.update(
+            start, old_count, widget.lines()[start:start + new_count])
+        out[out_start:out_start + out_old] = out_new
+    expected = list(clean_lines(widget.lines(), collapse_blank=False))
+    return edits, out, expected
+
+
+@pytest.mark.parametrize("edit, reported", [
+    (("delete", "1.end"), (0, 2, 1)),            # <Delete> at end of line
+    (("delete", "2.0-1c"), (0, 2, 1)),           # <BackSpace> at column 0
+    (("delete", "1.2"), (0, 1, 1)),
+    (("delete", "3.end"), (2, 1, 1)),            # final newline stays
+    (("delete", "1.0", "2.0"), (0, 2, 1)),
+    (("insert", "2.0", "x\ny\n"), (1, 1, 3)),
+])
+def test_hook_reports_touched_lines(edit, reported):
+    edits, out, expected = _live_after("a = 1\nb = 2\nc = 3", *edit)
+    assert edits == [reported]
+    assert out == expected
+
+
+@pytest.mark.parametrize("options", [
+    {}, {"remove_comments": True}, {"collapse_blank": False},
+    {"remove_comments": True, "trim_trailing": False},
+])
+def test_updates_match_full_clean(monkeypatch, options):
+    monkeypatch.setattr(cleaner_live, "BLOCK_SIZE", 2)
+    rng = random.Random(6)
+    pieces = ["x = 1", "", "  ", "# c", "  # d", "y = 2  "]
+    lines = [rng.choice(pieces) for _ in range(20)]
+    model = LiveCleaner(**options)
+    out = model.reset(lines)
+    for _ in range(400):
+        start = rng.randint(0, len(lines))
+        old_count = rng.randint(0, min(4, len(lines) - start))
+        new_lines = [rng.choice(pieces) for _ in range(rng.randint(0, 6))]
+        lines[start:start + old_count] = new_lines
+        out_start, out_old, out_new = model.update(start, old_count, new_lines)
+        out[out_start:out_start + out_old] = out_new
+        assert out == list(clean_lines(lines, **options))
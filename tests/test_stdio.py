@@ -0,0 +1,62 @@
+import io
+import json
+
+import pytest
+
+from cleaner_stdio import RequestError, StdioServer, parse_request
+
+
+@pytest.mark.parametrize("line, error, request_id", [
+    (b'{"id": 1, "code": "x"', "invalid JSON", None),
+    (b"not json", "invalid JSON", None),
+    (b'{"code": "\xff"}', "invalid JSON", None),
+    (b'["code", "x"]', "request must be a JSON object", None),
+    (b'{"id": 2}', '"code" must be a string', 2),
+    (b'{"id": 3, "code": 1}', '"code" must be a string', 3),
+    (b'{"id": "a", "code": "", "bogus": true}', "unknown option 'bogus'", "a"),
+    (b'{"code": "", "trim_trailing": "yes"}', "'trim_trailing' must be a bool",
+     None),
+    (b'{"code": "", "rules": "strip_bom"}', "'rules' must be a list", None),
+    (b'{"code": "", "comment_mode": "ast"}', "'comment_mode' must be one of",
+     None),
+    (b'{"id": 4, "code": "", "rules": ["nope"]}', "unknown rule 'nope'", 4),
+])
+def test_malformed_requests(line, error, request_id):
+    with pytest.raises(RequestError, match=error) as info:
+        parse_request(line)
+    assert info.value.request_id == request_id
+
+
+def test_request_options():
+    line = json.dumps({"id": 7, "code": "x = 1\n", "remove_comments": True,
+                       "rules": ["strip_bom"]}).encode()
+    assert parse_request(line) == (7, "x = 1\n", {"remove_comments": True,
+                                                  "rules": ["strip_bom"]})
+
+
+def test_server_keeps_going_after_bad_lines():
+    requests = [
+        {"id": 1, "code": "x = 1   \n\n\n\ny = 2\n"},
+        '{"id": 2, "code": ',
+        {"id": 3, "code": "# c\nz = 3\n", "remove_comments": True},
+        {"id": 4, "code": "", "op": "format"},
+        "",
+        {"id": 5, "code": "w = 4  \n"},
+    ]
+    stdin = io.BytesIO(b"".join(
+        (r if isinstance(r, str) else json.dumps(r)).encode() + b"\n"
+        for r in requests)[:-1])
+    stdout = io.BytesIO()
+    StdioServer(stdin, stdout, jobs=1).serve()
+    replies = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    by_id = {reply["id"]: reply for reply in replies}
+    assert len(replies) == 5
+    assert by_id[None]["status"] == "error"
+    assert by_id[None]["error"].startswith("invalid JSON")
+    assert by_id[4] == {"id": 4, "status": "error",
+                        "error": "unknown option 'op'"}
+    assert [by_id[i]["status"] for i in (1, 3, 5)] == ["ok"] * 3
+    assert by_id[1]["cleaned_code"] == "x = 1\n\ny = 2\n"
+    assert by_id[3]["cleaned_code"] == "z = 3\n"
+    # the last line had no newline
+    assert by_id[5]["cleaned_code"] == "w = 4\n"
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from backend_limits import QueueFull  # noqa: E402
+from backend_store import CodeStore, WriteQueue  # noqa: E402
+
+
+def blobs(store):
+    return sorted(name for _, _, files in os.walk(store.blob_dir)
+                  for name in files)
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = CodeStore(str(tmp_path))
+    first = store.put("x = 1\n", name="a.py")
+    second = store.put(b"x = 1\n", name="b.py")
+    assert first["sha256"] == second["sha256"]
+    assert first["id"] != second["id"]
+    assert (first["deduplicated"], second["deduplicated"]) == (False, True)
+    assert blobs(store) == [first["sha256"] + ".py"]
+    assert store.read(second["id"]) == b"x = 1\n"
+    assert store.get("missing") is None
+
+
+def test_blob_is_written_through_a_temporary_file(tmp_path, monkeypatch):
+    store = CodeStore(str(tmp_path))
+    replaced = []
+    real_replace = os.replace
+
+    def replace(src, dst):
+        assert open(src, "rb").read() == b"y = 2\n"
+        assert not os.path.exists(dst)
+        replaced.append((src, dst))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    record = store.put("y = 2\n")
+    [(src, dst)] = replaced
+    assert dst == record["filename"]
+    assert os.path.dirname(src) == os.path.dirname(dst)
+    assert src.endswith(".tmp") and not os.path.exists(src)
+
+
+def test_failed_write_leaves_no_files(tmp_path, monkeypatch):
+    store = CodeStore(str(tmp_path))
+
+    def replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(OSError, match="disk full"):
+        store.put("z = 3\n")
+    assert blobs(store) == []
+
+
+def test_index_records_every_upload(tmp_path):
+    store = CodeStore(str(tmp_path))
+    records = store.put_many([("a\n", "a.py", "batch"), ("a\n", "b.py", "batch"),
+                              ("b\n", None, None)])
+    with open(store.index_path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [r["id"] for r in lines] == [r["id"] for r in records]
+    assert lines[0] == {"id": records[0]["id"], "sha256": records[0]["sha256"],
+                        "size": 2, "name": "a.py", "batch_id": "batch",
+                        "received_at": records[0]["received_at"]}
+    with open(store.index_path, "a") as f:
+        f.write("{not json\n")
+    reloaded = CodeStore(str(tmp_path))
+    for record in records:
+        assert reloaded.get(record["id"]) == store.get(record["id"])
+
+
+def test_fsync_once_per_blob_and_once_per_batch(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    store = CodeStore(str(tmp_path))
+    batches = []
+    put_many = store.put_many
+
+    def recording_put_many(items, fsync=False):
+        batches.append(len(items))
+        return put_many(items, fsync=fsync)
+
+    monkeypatch.setattr(store, "put_many", recording_put_many)
+    writes = WriteQueue(store, batch_size=4)
+
+    async def run():
+        records = await asyncio.gather(
+            *(writes.submit(f"x = {i}\n", name=f"{i}.py") for i in range(6)),
+            writes.submit("x = 0\n", name="again.py"))
+        await writes.close()
+        return records
+
+    records = asyncio.run(run())
+    assert [r["name"] for r in records] == [f"{i}.py" for i in range(6)] + \
+        ["again.py"]
+    assert records[-1]["deduplicated"]
+    assert batches == [4, 3]
+    # six new blobs, then the index once for each of the two batches
+    assert len(synced) == 6 + 2
+
+
+def test_no_fsync_when_disabled(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    writes = WriteQueue(CodeStore(str(tmp_path)), fsync=False)
+
+    async def run():
+        await writes.submit("x = 1\n")
+        await writes.close()
+
+    asyncio.run(run())
+    assert synced == []
+
+
+def test_full_queue_refuses_unless_waiting(tmp_path):
+    store = CodeStore(str(tmp_path))
+    writes = WriteQueue(store, max_pending=1, fsync=False)
+
+    async def run():
+        results = await asyncio.gather(
+            writes.submit("a\n"), writes.submit("b\n"),
+            writes.submit("c\n", wait=True), return_exceptions=True)
+        await writes.close()
+        return results
+
+    first, second, third = asyncio.run(run())
+    assert first["size"] == 2 and third["size"] == 2
+    assert isinstance(second, QueueFull)
+    assert len(blobs(store)) == 2
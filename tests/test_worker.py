@@ -0,0 +1,45 @@
+import time
+
+from cleaner_diff import highlight_changes
+from cleaner_worker import CleanWorker
+
+
+class FakeText:
+    def __init__(self):
+        self.tags = []
+
+    def tag_remove(self, tag, start, end):
+        self.tags = [t for t in self.tags if t[0] != tag]
+
+    def tag_add(self, tag, start, end):
+        self.tags.append((tag, start, end))
+
+
+def wait_done(worker):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        for kind, value in worker.poll():
+            if kind != "progress":
+                assert kind == "done", value
+                return value
+        time.sleep(0.01)
+    raise AssertionError("worker did not finish")
+
+
+def test_changes_are_computed_by_the_worker():
+    worker = CleanWorker()
+    worker.submit("x = 1   \n\n\n\ny = 2\n# c\n", changes=True,
+                  remove_comments=True)
+    cleaned, stats = wait_done(worker)
+    assert cleaned == "x = 1\n\ny = 2\n"
+    widget = FakeText()
+    assert highlight_changes(widget, stats["changes"]) == len(stats["changes"])
+    assert ("changed", "1.0", "2.0") in widget.tags
+    assert widget.tags[-1] == ("removed", "3.0", "3.end")
+
+
+def test_changes_are_skipped_unless_asked_for():
+    worker = CleanWorker()
+    worker.submit("x = 1   \n")
+    _, stats = wait_done(worker)
+    assert "changes" not in stats